@@ -1,15 +1,40 @@
-import requests
 import time
 import os
 import sys
 import json
 import threading
 import sqlite3
-from datetime import datetime, timedelta
-from flask import Flask, jsonify, request
+import heapq
+import hashlib
+import hmac
+import signal
+from datetime import datetime
+from collections import OrderedDict, defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+from flask import Flask, Response, jsonify, request
+from flask.json.provider import JSONProvider
 from threading import Thread
-import traceback
-import urllib.parse
+from types import MappingProxyType
+from functools import lru_cache
+import logging
+import logging.handlers
+import queue
+import atexit
+
+try:
+    import orjson
+except ImportError:  # fall back to Flask's default json provider
+    orjson = None
+
+# Log records are queued by the calling thread and written to stdout by a listener thread
+log_queue = queue.SimpleQueue()
+log_listener = logging.handlers.QueueListener(log_queue, logging.StreamHandler(sys.stdout))
+log_listener.start()
+atexit.register(log_listener.stop)
+
+logging.basicConfig(level=os.environ.get('LOG_LEVEL', 'INFO').upper(), format='%(message)s',
+                    handlers=[logging.handlers.QueueHandler(log_queue)])
+logger = logging.getLogger('bot')
 
 print("TELEGRAM BOT - ADMIN PROTECTION SYSTEM")
 print("Delete Non-Admin Posts + Comment Detection")
@@ -29,6 +54,10 @@ if not BOT_TOKEN:
 
 PORT = int(os.environ.get('PORT', 8080))
 REDEPLOY_TOKEN = os.environ.get('REDEPLOY_TOKEN', 'default_redeploy_token')
+REDEPLOY_TOKEN_BYTES = REDEPLOY_TOKEN.encode()
+FLASK_THREADS = int(os.environ.get('FLASK_THREADS', 16))
+UPDATE_WORKERS = int(os.environ.get('UPDATE_WORKERS', 16))
+UPDATE_QUEUE_LIMIT = int(os.environ.get('UPDATE_QUEUE_LIMIT', 256))
 
 # Parse multiple admin IDs from environment variable
 admin_ids_raw = os.environ.get('BOT_OWNER_IDS', '7713987088 7475473197')
@@ -55,8 +84,11 @@ print(f"✅ Admin IDs loaded: {admin_ids}")
 print(f"✅ Using PORT: {PORT}")
 print(f"✅ Redeploy token: {'Set' if REDEPLOY_TOKEN != 'default_redeploy_token' else 'Using default'}")
 
-# Delete time options (in seconds)
-DELETE_TIME_OPTIONS = {
+# SQLite database file
+DB_PATH = 'protection_bot.db'
+
+# Delete time options (in seconds), read-only so callback handlers can validate against it
+DELETE_TIME_OPTIONS = MappingProxyType({
     '30s': 30,
     '1m': 60,
     '5m': 300,
@@ -66,35 +98,362 @@ DELETE_TIME_OPTIONS = {
     '12h': 43200,
     '24h': 86400,
     'never': 0
+})
+
+# How long (in seconds) get_system_stats results are reused
+STATS_CACHE_TTL = 5
+
+# Fan-out Bot API calls per second (owner notifications and one-by-one delete
+# fallbacks share this budget; Telegram allows about 30 requests/s per bot)
+API_FANOUT_RATE = 25
+
+# How long (in seconds) a /health getMe check is reused
+HEALTH_CHECK_TTL = 30
+
+# Longest the auto-delete monitor sleeps in one wait, also used as the retry
+# delay for posts whose deletion failed
+MONITOR_MAX_WAIT = 300
+
+# Telegram accepts at most 100 message IDs per deleteMessages call
+DELETE_BATCH_SIZE = 100
+
+# Extra wait (in seconds) so deletions due close together share one batch
+DELETE_BATCH_WINDOW = 0.2
+
+# Admin-status lookups are cached per (chat, user) for CHANNEL_CACHE_TTL seconds,
+# keeping at most CHANNEL_CACHE_SIZE entries (least recently used evicted first)
+CHANNEL_CACHE_TTL = 300
+CHANNEL_CACHE_SIZE = 4096
+
+# Units used by format_seconds, largest first
+TIME_UNITS = ((86400, 'day'), (3600, 'hour'), (60, 'minute'), (1, 'second'))
+
+# Message fields checked in order to classify a message
+MESSAGE_TYPES = ('text', 'photo', 'video', 'document', 'sticker', 'audio', 'voice')
+
+# (field, extractor) pairs checked in order to summarize a message's content
+MESSAGE_CONTENT_EXTRACTORS = (
+    ('text', lambda message: message['text']),
+    ('caption', lambda message: message['caption']),
+    ('sticker', lambda message: f"Sticker: {message['sticker'].get('emoji', '')}"),
+    ('photo', lambda message: "[Photo]"),
+    ('video', lambda message: "[Video]"),
+    ('document', lambda message: f"Document: {message['document'].get('file_name', '')}"),
+    ('audio', lambda message: "[Audio]"),
+    ('voice', lambda message: "[Voice Message]"),
+)
+
+# Content-Type for pre-encoded JSON request bodies
+JSON_HEADERS = {'Content-Type': 'application/json'}
+
+# Update types the bot handles (sent to setWebhook and getUpdates)
+ALLOWED_UPDATES = json.dumps(['message', 'edited_message', 'channel_post', 'callback_query',
+                              'my_chat_member'])
+
+# getUpdates long-poll timeout (in seconds)
+LONG_POLL_TIMEOUT = 50
+
+# Most webhook connections Telegram may open at once
+WEBHOOK_MAX_CONNECTIONS = 100
+
+# Set DROP_PENDING_UPDATES=1 to discard the update backlog Telegram queued while the bot was down
+DROP_PENDING_UPDATES = os.environ.get('DROP_PENDING_UPDATES', '').lower() in ('1', 'true', 'yes')
+
+# How long (in seconds) the bot waits for a typed reply, e.g. an admin ID
+USER_STATE_TTL = 600
+
+# How long (in seconds) getChat results (channel title/username) are reused
+CHAT_INFO_TTL = 3600
+
+# Queued hot-path writes are committed together every WRITE_FLUSH_INTERVAL
+# seconds, or sooner once WRITE_FLUSH_SIZE statements are waiting
+WRITE_FLUSH_INTERVAL = 0.2
+WRITE_FLUSH_SIZE = 64
+
+# Pre-rendered response templates (HTML parse mode)
+ALREADY_PROTECTED_TEXT = """✅ <b>Already Protected</b>
+
+User ID: {admin_id}
+Name: {name}
+Status: Already a protected admin
+
+Their posts will NOT be auto-deleted."""
+
+ADMIN_ADDED_TEXT = """✅ <b>Admin Added Successfully!</b>
+
+👤 User ID: {admin_id}
+👑 Added by: Bot Owner
+⏰ Default Delete Time: Never (protected)
+
+📝 <b>What this means:</b>
+• This user can now post without auto-deletion
+• Their posts are protected
+• You can set custom delete time per admin
+• Other users' posts will still be deleted"""
+
+WELCOME_TEXT = """👋 Welcome {first_name}!
+
+🤖 <b>Channel Protection Bot</b>
+
+I protect your channels by:
+• 🚫 Auto-deleting posts from non-admins
+• 🔔 Notifying about comments/replies
+• ⏰ Scheduling deletions with inline buttons
+
+👑 <b>Bot Owners:</b> {owner_count} users
+🔧 <b>Status:</b> ✅ Active and ready
+
+Use the buttons below to control the bot:"""
+
+STATS_TEXT = """📊 <b>Bot Statistics</b>
+
+🤖 Bot: @{bot_username}
+👥 Bot Owners: {owner_count}
+👑 Protected Admins: {active_admins}
+🗑️ Posts Sent for Deletion: {total_posts_deleted}
+💬 Comments Detected: {total_comments_detected}
+⏰ Pending Deletions: {pending_deletions}
+
+⚙️ <b>Settings:</b>
+• Global Delete Time: {global_time}
+• Comment Notifications: ✅ Active
+• Auto-Deletion: ✅ Active
+
+🛡️ <b>Protection Status:</b>
+✅ All systems operational"""
+
+HELP_TEXT = """📚 <b>Channel Protection Bot Help</b>
+
+🤖 <b>About:</b>
+I automatically delete posts from non-admins and notify about comments.
+
+👑 <b>Protected Admins:</b>
+• Admins' posts are NOT deleted (or deleted after custom time)
+• Each admin can have individual delete time
+• Use the Admins menu to manage them
+
+⏰ <b>Delete Times:</b>
+• Global time applies to all non-admins
+• Admin-specific time overrides global for that admin
+• Times range from 30 seconds to 24 hours
+• "Never" means posts are protected
+
+🔔 <b>Notifications:</b>
+• All bot owners get notified about comments
+• Notifications include message links
+• Comment detection is automatic
+
+⚙️ <b>Setup:</b>
+1. Add me as admin to your channel
+2. Grant me delete message permission
+3. Add trusted users as protected admins
+4. Set delete times as needed
+
+❓ <b>How to Get User ID:</b>
+Use @userinfobot or forward a message from the user to @getidsbot
+
+💡 <b>Adding Admins:</b>
+1. Click "Add Admin" in the menu
+2. Click "Enter User ID Manually"
+3. Send the numeric User ID (e.g., 123456789)
+4. The bot will confirm with success message"""
+
+COMMENT_NOTIFICATION_TEXT = """💬 <b>New Comment Detected!</b>
+
+📢 Channel: {channel_name}
+{channel_line}
+
+👤 Commenter: {commenter_name}
+{commenter_line}
+
+💭 Comment: {comment}
+
+🔗 Message Link: {message_link}
+
+⏰ Time: {time}"""
+
+# Static inline keyboards (built once, shared by every reply)
+MAIN_MENU_KEYBOARD = {
+    'inline_keyboard': [
+        [{'text': '👑 Manage Admins', 'callback_data': 'admins_menu'}],
+        [{'text': '⏰ Set Delete Time', 'callback_data': 'time_menu'}],
+        [{'text': '📊 View Stats', 'callback_data': 'stats_menu'}],
+        [{'text': '❓ Help', 'callback_data': 'help_menu'}]
+    ]
+}
+
+ADMINS_MENU_KEYBOARD = {
+    'inline_keyboard': [
+        [{'text': '➕ Add Admin', 'callback_data': 'add_admin'}],
+        [{'text': '📋 List Admins', 'callback_data': 'list_admins'}],
+        [{'text': '🗑️ Remove Admin', 'callback_data': 'remove_admin'}],
+        [{'text': '🔙 Back to Main', 'callback_data': 'main_menu'}]
+    ]
 }
 
+BACK_KEYBOARD = {
+    'inline_keyboard': [
+        [{'text': '🔙 Back to Main', 'callback_data': 'main_menu'}]
+    ]
+}
+
+ADD_ADMIN_MENU_KEYBOARD = {
+    'inline_keyboard': [
+        [{'text': '📝 Enter User ID Manually', 'callback_data': 'confirm_add_admin'}],
+        [{'text': '❓ How to Get User ID', 'callback_data': 'help_menu'}],
+        [{'text': '🔙 Back to Admins Menu', 'callback_data': 'admins_menu'}]
+    ]
+}
+
+NO_ADMINS_KEYBOARD = {
+    'inline_keyboard': [
+        [{'text': '➕ Add First Admin', 'callback_data': 'add_admin'}],
+        [{'text': '🔙 Back to Main', 'callback_data': 'main_menu'}]
+    ]
+}
+
+ADMIN_REMOVED_KEYBOARD = {
+    'inline_keyboard': [
+        [{'text': '📋 View Remaining Admins', 'callback_data': 'list_admins'}],
+        [{'text': '➕ Add New Admin', 'callback_data': 'add_admin'}],
+        [{'text': '🔙 Main Menu', 'callback_data': 'main_menu'}]
+    ]
+}
+
+REMOVE_NO_ADMINS_KEYBOARD = {
+    'inline_keyboard': [
+        [{'text': '➕ Add First Admin', 'callback_data': 'add_admin'}],
+        [{'text': '🔙 Back to Admins Menu', 'callback_data': 'admins_menu'}]
+    ]
+}
+
+TIME_MENU_KEYBOARD = {
+    'inline_keyboard': [
+        [{'text': '30 Seconds', 'callback_data': 'set_time_30s'}],
+        [{'text': '1 Minute', 'callback_data': 'set_time_1m'}],
+        [{'text': '5 Minutes', 'callback_data': 'set_time_5m'}],
+        [{'text': '10 Minutes', 'callback_data': 'set_time_10m'}],
+        [{'text': '1 Hour', 'callback_data': 'set_time_1h'}],
+        [{'text': '2 Hours', 'callback_data': 'set_time_2h'}],
+        [{'text': '12 Hours', 'callback_data': 'set_time_12h'}],
+        [{'text': '24 Hours', 'callback_data': 'set_time_24h'}],
+        [{'text': '🔙 Back to Main', 'callback_data': 'main_menu'}]
+    ]
+}
+
+GLOBAL_TIME_SET_KEYBOARD = {
+    'inline_keyboard': [
+        [{'text': '⚙️ Back to Time Settings', 'callback_data': 'time_menu'}],
+        [{'text': '👑 Manage Admin Times', 'callback_data': 'admins_menu'}],
+        [{'text': '🔙 Main Menu', 'callback_data': 'main_menu'}]
+    ]
+}
+
+STATS_KEYBOARD = {
+    'inline_keyboard': [
+        [{'text': '⏰ Change Global Time', 'callback_data': 'time_menu'}],
+        [{'text': '🔄 Refresh Stats', 'callback_data': 'stats_menu'}],
+        [{'text': '🔙 Back to Main', 'callback_data': 'main_menu'}]
+    ]
+}
+
+HELP_KEYBOARD = {
+    'inline_keyboard': [
+        [{'text': '👑 Manage Admins', 'callback_data': 'admins_menu'}],
+        [{'text': '⏰ Set Global Time', 'callback_data': 'time_menu'}],
+        [{'text': '🔙 Main Menu', 'callback_data': 'main_menu'}]
+    ]
+}
+
+# (unix second, formatted local time) last produced by format_now
+_now_cache = (0, '')
+
+def format_now():
+    """Current local time as 'YYYY-MM-DD HH:MM:SS', formatted at most once per second"""
+    global _now_cache
+    second = int(time.time())
+    if _now_cache[0] != second:
+        _now_cache = (second, time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(second)))
+    return _now_cache[1]
+
+def decode_json(body):
+    """Decode a JSON body (bytes or str), with orjson when available"""
+    return orjson.loads(body) if orjson is not None else json.loads(body)
+
+class ORJSONProvider(JSONProvider):
+    """Flask JSON provider backed by orjson (webhook bodies and jsonify responses)"""
+    
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS).decode()
+    
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+# (button label, DELETE_TIME_OPTIONS key) rows of the per-admin time menu
+ADMIN_TIME_BUTTONS = (
+    ('30 Seconds', '30s'),
+    ('1 Minute', '1m'),
+    ('5 Minutes', '5m'),
+    ('10 Minutes', '10m'),
+    ('1 Hour', '1h'),
+    ('2 Hours', '2h'),
+    ('12 Hours', '12h'),
+    ('24 Hours', '24h'),
+    ('❌ Never (Protected)', 'never')
+)
+
+ADMIN_TIME_BACK_ROW = [{'text': '🔙 Back to Admin List', 'callback_data': 'list_admins'}]
+
+def build_admin_time_keyboard(admin_id):
+    """Build the per-admin delete time keyboard (only callback_data depends on admin_id)"""
+    rows = [[{'text': label, 'callback_data': f'admin_time_{admin_id}_{key}'}] for label, key in ADMIN_TIME_BUTTONS]
+    rows.append([{'text': '🗑️ Remove This Admin', 'callback_data': f'delete_admin_{admin_id}'}])
+    rows.append(ADMIN_TIME_BACK_ROW)
+    return {'inline_keyboard': rows}
+
 # Health check server
 app = Flask(__name__)
+if orjson is not None:
+    app.json = ORJSONProvider(app)
 
 # Global bot instance
 bot = None
 
-@app.route('/health')
+# Webhook updates are processed on a fixed pool; the semaphore caps how many
+# can be queued or running before the webhook answers 503
+UPDATE_POOL = ThreadPoolExecutor(max_workers=UPDATE_WORKERS, thread_name_prefix='tg-update')
+UPDATE_SLOTS = threading.BoundedSemaphore(UPDATE_QUEUE_LIMIT)
+
+def build_health_body(bot_status):
+    """Build the static /health JSON body for a bot status"""
+    return json.dumps({
+        'status': 'healthy',
+        'service': 'telegram-admin-protection-bot',
+        'version': '1.0.0',
+        'bot_status': bot_status,
+        'checks': {
+            'bot': {'status': bot_status, 'message': f'Bot is {bot_status}'},
+            'system': {'status': 'healthy', 'message': 'System operational'},
+            'database': {'status': 'healthy', 'message': 'Database connected'}
+        }
+    }).encode()
+
+# Health responses never change for a given bot status, so encode them once
+HEALTH_BODIES = {status: build_health_body(status) for status in ('unknown', 'healthy', 'unhealthy')}
+
+@app.route('/health', methods=['GET', 'HEAD'])
 def health_check():
     """Health check endpoint"""
+    # Uptime pingers only need the status code, skip the Telegram round-trip
+    if request.method == 'HEAD':
+        return Response(status=200, mimetype='application/json')
+    
     try:
         bot_status = 'unknown'
         if bot is not None:
-            bot_status = 'healthy' if bot.test_connection() else 'unhealthy'
+            bot_status = 'healthy' if bot.is_healthy() else 'unhealthy'
         
-        health_status = {
-            'status': 'healthy',
-            'timestamp': time.time(),
-            'service': 'telegram-admin-protection-bot',
-            'version': '1.0.0',
-            'bot_status': bot_status,
-            'checks': {
-                'bot': {'status': bot_status, 'message': f'Bot is {bot_status}'},
-                'system': {'status': 'healthy', 'message': 'System operational'},
-                'database': {'status': 'healthy', 'message': 'Database connected'}
-            }
-        }
-        return jsonify(health_status), 200
+        return Response(HEALTH_BODIES[bot_status], status=200, mimetype='application/json')
     except Exception as e:
         return jsonify({
             'status': 'error',
@@ -108,7 +467,7 @@ def redeploy_bot():
     """Redeploy endpoint"""
     try:
         auth_token = request.headers.get('Authorization', '')
-        is_authorized = auth_token == REDEPLOY_TOKEN
+        is_authorized = hmac.compare_digest(auth_token.encode(), REDEPLOY_TOKEN_BYTES)
         
         if not is_authorized:
             return jsonify({
@@ -116,10 +475,18 @@ def redeploy_bot():
                 'message': 'Unauthorized access'
             }), 401
         
-        print(f"🔄 Redeploy triggered via API")
+        logger.info("🔄 Redeploy triggered via API")
         
         def delayed_restart():
             time.sleep(3)
+            # os._exit skips cleanup, so write out queued rows and counters first
+            if bot is not None:
+                try:
+                    bot.flush_writes()
+                    bot.flush_stats()
+                except Exception as e:
+                    logger.error("❌ Error flushing before restart: %s", e)
+            log_listener.stop()
             os._exit(0)
         
         restart_thread = threading.Thread(target=delayed_restart, daemon=True)
@@ -143,7 +510,7 @@ def get_admin_stats():
     """Get admin system statistics"""
     try:
         auth_token = request.headers.get('Authorization', '')
-        is_authorized = auth_token == REDEPLOY_TOKEN
+        is_authorized = hmac.compare_digest(auth_token.encode(), REDEPLOY_TOKEN_BYTES)
         
         if not is_authorized:
             return jsonify({
@@ -157,13 +524,17 @@ def get_admin_stats():
                 'message': 'Bot not initialized'
             }), 500
         
-        stats = bot.get_system_stats()
+        stats_json = bot.get_system_stats_json()
+        if stats_json is None:
+            return jsonify({
+                'status': 'success',
+                'stats': bot.get_system_stats(),
+                'timestamp': datetime.now().isoformat()
+            }), 200
         
-        return jsonify({
-            'status': 'success',
-            'stats': stats,
-            'timestamp': datetime.now().isoformat()
-        }), 200
+        payload = (b'{"status":"success","stats":' + stats_json +
+                   b',"timestamp":"' + datetime.now().isoformat().encode() + b'"}')
+        return Response(payload, status=200, mimetype='application/json')
         
     except Exception as e:
         return jsonify({
@@ -172,27 +543,35 @@ def get_admin_stats():
             'timestamp': time.time()
         }), 500
 
+# Root endpoint body is static, encode it (and its ETag) once
+HOME_BODY = json.dumps({
+    'service': 'Telegram Admin Protection Bot',
+    'status': 'running',
+    'version': '1.0.0',
+    'endpoints': {
+        'health': '/health',
+        'redeploy': '/redeploy (POST)',
+        'admin_stats': '/admin/stats (GET)',
+        'webhook': '/webhook (POST)'
+    },
+    'features': [
+        'Delete Non-Admin Posts',
+        'Comment/Reply Detection',
+        'Owner Notifications',
+        'Auto-Delete Scheduling with Inline Buttons',
+        '24/7 Keep-Alive'
+    ]
+}).encode()
+HOME_ETAG = hashlib.md5(HOME_BODY).hexdigest()
+
 @app.route('/')
 def home():
     """Root endpoint"""
-    return jsonify({
-        'service': 'Telegram Admin Protection Bot',
-        'status': 'running',
-        'version': '1.0.0',
-        'endpoints': {
-            'health': '/health',
-            'redeploy': '/redeploy (POST)',
-            'admin_stats': '/admin/stats (GET)',
-            'webhook': '/webhook (POST)'
-        },
-        'features': [
-            'Delete Non-Admin Posts',
-            'Comment/Reply Detection',
-            'Owner Notifications',
-            'Auto-Delete Scheduling with Inline Buttons',
-            '24/7 Keep-Alive'
-        ]
-    })
+    response = Response(HOME_BODY, mimetype='application/json')
+    response.set_etag(HOME_ETAG)
+    response.cache_control.public = True
+    response.cache_control.max_age = 60
+    return response.make_conditional(request)
 
 @app.route('/webhook', methods=['POST'])
 def webhook():
@@ -201,63 +580,213 @@ def webhook():
         if bot is None:
             return jsonify({'status': 'error', 'message': 'Bot not initialized'}), 500
         
-        update = request.get_json()
-        if update:
-            # Process update in a separate thread to avoid blocking
-            threading.Thread(target=bot.process_update, args=(update,)).start()
+        # Decoding happens on the worker too, so Telegram gets its 200 right away
+        body = request.get_data(cache=False)
+        if body:
+            # Process update on the worker pool to avoid blocking
+            if not UPDATE_SLOTS.acquire(blocking=False):
+                return 'busy', 503
+            try:
+                future = UPDATE_POOL.submit(bot.process_raw_update, body)
+            except Exception:
+                UPDATE_SLOTS.release()
+                raise
+            future.add_done_callback(lambda f: UPDATE_SLOTS.release())
             return 'ok', 200
         else:
             return 'no update', 400
     except Exception as e:
-        print(f"❌ Webhook error: {e}")
+        logger.error("❌ Webhook error: %s", e)
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
 def run_flask_server():
     """Run the Flask server"""
-    try:
-        print(f"🔄 Starting Flask server on port {PORT}")
-        app.run(host='0.0.0.0', port=PORT, debug=False, use_reloader=False, threaded=True)
-    except Exception as e:
-        print(f"❌ Flask server error: {e}")
-        time.sleep(5)
-        run_flask_server()
+    from waitress import serve
+    
+    logger.info("🔄 Starting Flask server on port %s", PORT)
+    serve(app, host='0.0.0.0', port=PORT, threads=FLASK_THREADS, connection_limit=1000, channel_timeout=30)
 
 def start_flask_server():
     """Start Flask server in background"""
     def flask_wrapper():
+        restart_delay = 5
         while True:
             try:
                 run_flask_server()
             except Exception as e:
-                print(f"❌ Flask server crashed, restarting: {e}")
-                time.sleep(10)
+                logger.error("❌ Flask server crashed, restarting in %ss: %s", restart_delay, e)
+            time.sleep(restart_delay)
+            restart_delay = min(restart_delay * 2, 60)
     
     t = Thread(target=flask_wrapper, daemon=True)
     t.start()
-    print(f"✅ Flask server started on port {PORT}")
+    logger.info("✅ Flask server started on port %s", PORT)
 
 # ==================== TELEGRAM BOT CLASS ====================
 
+class StatsCounters:
+    """In-memory counters not yet written to the bot_stats table
+    
+    posts_deleted counts messages sent for deletion: a deleteMessages batch adds all of
+    its IDs, including ones Telegram skipped because they were already removed.
+    """
+    __slots__ = ('posts_deleted', 'comments_detected')
+    
+    def __init__(self):
+        self.posts_deleted = 0
+        self.comments_detected = 0
+
+class RateLimiter:
+    """Thread-safe token bucket: bursts of up to rate calls, refilled at rate per second"""
+    
+    def __init__(self, rate):
+        self.rate = rate
+        self.tokens = rate
+        self.last_refill = time.monotonic()
+        self.lock = threading.Lock()
+    
+    def acquire(self):
+        """Block until one more call fits in the budget"""
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.rate, self.tokens + (now - self.last_refill) * self.rate)
+            self.last_refill = now
+            if self.tokens < 1:
+                time.sleep((1 - self.tokens) / self.rate)
+                self.tokens = 1
+                self.last_refill = time.monotonic()
+            self.tokens -= 1
+
 class TelegramProtectionBot:
     def __init__(self, token, owner_ids):
         self.token = token
         self.base_url = f"https://api.telegram.org/bot{token}/"
         self.owner_ids = owner_ids if isinstance(owner_ids, list) else [owner_ids]
-        self.conn = None
+        self.owner_id_set = frozenset(self.owner_ids)
+        self.conn = None  # the single writer connection, shared by all threads
+        self.write_lock = threading.RLock()  # one write transaction on self.conn at a time
+        self._read_local = threading.local()  # per-thread read-only connections
+        
+        # In-memory copies of rarely-changing settings, kept in step by the mutators
+        self._admin_cache = {}  # active admin user_id -> delete_after_seconds
+        self._global_delete_seconds = 86400
         self.bot_username = None
-        self.channel_cache = {}
+        self.bot_id = None
+        
+        # One session for all Bot API calls so the TLS connection is reused
+        import requests
+        from requests.adapters import HTTPAdapter
+        from urllib3.util.retry import Retry
+        self.session = requests.Session()
+        self.session.mount('https://', HTTPAdapter(
+            pool_connections=32,
+            pool_maxsize=64,
+            max_retries=Retry(total=3, backoff_factor=0.2,
+                              status_forcelist=[429, 500, 502, 503, 504],
+                              raise_on_status=False)
+        ))
+        # Lets one update fan out independent Bot API calls (e.g. owner notifications)
+        self.api_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix='tg-api')
+        self.channel_cache = OrderedDict()  # (chat_id, user_id) -> (expires_at, is_admin)
+        self.channel_cache_lock = threading.Lock()
+        self.chat_info_cache = {}  # chat_id -> (expires_at, getChat result)
+        self._notify_queue = queue.SimpleQueue()  # (owner_id, text) waiting for the notifier
+        self.api_rate = RateLimiter(API_FANOUT_RATE)  # gates every call fanned out to api_pool
+        self._stats = StatsCounters()
+        
+        # Short-lived cache so bursts of stats requests share one set of queries
+        self._stats_cache = None
+        self._stats_cache_json = None
+        self._stats_cache_time = 0.0
+        self._healthy = False
+        self._health_checked_at = float('-inf')
+        self._stats_cache_lock = threading.Lock()
+        
+        # Min-heap of scheduled deletion timestamps, drives the auto-delete monitor
+        self._delete_heap = []
+        self._delete_cond = threading.Condition()
+        
+        # Hot-path INSERT/UPDATEs queued for the write flusher thread
+        self._pending_writes = deque()
+        self._write_cond = threading.Condition()
+        
+        # Slash command dispatch: command -> handler(message, args)
+        self.command_handlers = {
+            '/start': lambda message, args: self.handle_start(message),
+            '/menu': lambda message, args: self.show_main_menu(message),
+            '/help': lambda message, args: self.show_help_menu(message),
+            '/addadmin': self.handle_addadmin_command,
+        }
+        
+        # Inline button dispatch: exact callback_data -> handler(chat_id, message_id, user_id)
+        self.callback_handlers = {
+            'main_menu': lambda chat_id, message_id, user_id: self.show_main_menu_via_callback(chat_id, message_id),
+            'admins_menu': lambda chat_id, message_id, user_id: self.show_admins_menu(chat_id, message_id),
+            'add_admin': lambda chat_id, message_id, user_id: self.show_add_admin_menu(chat_id, message_id),
+            'list_admins': lambda chat_id, message_id, user_id: self.show_list_admins(chat_id, message_id),
+            'remove_admin': lambda chat_id, message_id, user_id: self.show_remove_admin_menu(chat_id, message_id),
+            'time_menu': lambda chat_id, message_id, user_id: self.show_time_menu(chat_id, message_id),
+            'stats_menu': lambda chat_id, message_id, user_id: self.show_stats(chat_id, message_id),
+            'help_menu': lambda chat_id, message_id, user_id: self.show_help(chat_id, message_id),
+            'confirm_add_admin': self.request_admin_id,
+            'back': lambda chat_id, message_id, user_id: self.show_main_menu_via_callback(chat_id, message_id),
+        }
+        
+        # Prefixed callback_data -> handler(chat_id, message_id, user_id, suffix)
+        self.callback_prefix_handlers = (
+            ('set_time_', lambda chat_id, message_id, user_id, suffix:
+                self.set_global_delete_time(chat_id, message_id, suffix, user_id)),
+            ('admin_time_', self.handle_admin_time_callback),
+            ('select_admin_', lambda chat_id, message_id, user_id, suffix:
+                self.show_admin_time_menu(chat_id, message_id, int(suffix))),
+            ('delete_admin_', lambda chat_id, message_id, user_id, suffix:
+                self.delete_admin(chat_id, message_id, int(suffix), user_id)),
+            ('process_admin_id_', lambda chat_id, message_id, user_id, suffix:
+                self.add_admin(chat_id, message_id, int(suffix), user_id)),
+        )
         
         # User states for tracking input
-        self.user_states = {}  # user_id -> {'state': 'waiting_for_admin_id', 'data': {}}
+        self.user_states = {}  # user_id -> {'state': 'waiting_for_admin_id', 'chat_id': ..., 'expires_at': ...}
+        self.user_states_lock = threading.Lock()
         
-        print(f"🤖 Bot initialized with token: {token[:10]}...")
-        print(f"👑 Bot Owner IDs: {self.owner_ids}")
+        logger.info("🤖 Bot initialized with token: %s...", token[:10])
+        logger.info("👑 Bot Owner IDs: %s", self.owner_ids)
         self.setup_database()
+        self.start_write_flusher()
+        self.start_notifier()
+    
+    def get_read_conn(self):
+        """Get this thread's read-only connection (WAL lets it read while self.conn writes)"""
+        conn = getattr(self._read_local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(f'file:{DB_PATH}?mode=ro', uri=True, cached_statements=256)
+            self._read_local.conn = conn
+        return conn
+    
+    def load_settings_cache(self):
+        """Load active admins and the global delete time into memory"""
+        cursor = self.conn.cursor()
+        cursor.execute('SELECT user_id, delete_after_seconds FROM channel_admins WHERE is_active = 1')
+        self._admin_cache = dict(cursor.fetchall())
+        cursor.execute('SELECT global_delete_seconds FROM global_settings WHERE id = 1')
+        self._global_delete_seconds = cursor.fetchone()[0]
     
     def setup_database(self):
         """Setup database tables"""
         try:
-            self.conn = sqlite3.connect('protection_bot.db', check_same_thread=False)
+            # Larger statement cache keeps every hot-path query prepared
+            self.conn = sqlite3.connect(DB_PATH, check_same_thread=False, cached_statements=256)
+            
+            # WAL lets the monitor thread write while handlers read; NORMAL sync drops an fsync per commit
+            self.conn.executescript('''
+                PRAGMA journal_mode = WAL;
+                PRAGMA synchronous = NORMAL;
+                PRAGMA temp_store = MEMORY;
+                PRAGMA mmap_size = 134217728;
+                PRAGMA cache_size = -20000;
+                PRAGMA busy_timeout = 5000;
+            ''')
+            
             cursor = self.conn.cursor()
             
             # Channel admins table (users who can post without deletion)
@@ -286,10 +815,10 @@ class TelegramProtectionBot:
             # Initialize bot owners if table is empty
             cursor.execute('SELECT COUNT(*) FROM bot_owners')
             if cursor.fetchone()[0] == 0:
-                for owner_id in self.owner_ids:
-                    cursor.execute('INSERT OR IGNORE INTO bot_owners (user_id) VALUES (?)', (owner_id,))
+                cursor.executemany('INSERT OR IGNORE INTO bot_owners (user_id) VALUES (?)',
+                                   [(owner_id,) for owner_id in self.owner_ids])
                 self.conn.commit()
-                print(f"✅ Initialized {len(self.owner_ids)} bot owners in database")
+                logger.info("✅ Initialized %s bot owners in database", len(self.owner_ids))
             
             # Non-admin posts table (posts to be deleted)
             cursor.execute('''
@@ -300,7 +829,7 @@ class TelegramProtectionBot:
                     user_id INTEGER,
                     user_name TEXT,
                     delete_after_seconds INTEGER,
-                    scheduled_delete_time DATETIME,
+                    scheduled_delete_time INTEGER,
                     created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
                     deleted_at DATETIME,
                     is_active INTEGER DEFAULT 1,
@@ -348,28 +877,66 @@ class TelegramProtectionBot:
             ''')
             
             cursor.execute('INSERT OR IGNORE INTO bot_stats (id) VALUES (1)')
+            
+            # Indexes for the auto-delete sweep and stats counts
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_non_admin_posts_due 
+                ON non_admin_posts(is_active, scheduled_delete_time) 
+                WHERE is_active = 1
+            ''')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_channel_admins_active ON channel_admins(is_active)')
+            
+            # Older databases stored scheduled_delete_time as datetime text; convert to Unix seconds
+            cursor.execute('''
+                UPDATE non_admin_posts 
+                SET scheduled_delete_time = CAST(strftime('%s', scheduled_delete_time) AS INTEGER) 
+                WHERE typeof(scheduled_delete_time) = 'text'
+            ''')
+            
+            # Count admins only when a row is genuinely inserted
+            cursor.execute('''
+                CREATE TRIGGER IF NOT EXISTS trg_channel_admins_added 
+                AFTER INSERT ON channel_admins 
+                BEGIN 
+                    UPDATE bot_stats SET total_admins_added = total_admins_added + 1 WHERE id = 1; 
+                END
+            ''')
+            
             self.conn.commit()
-            print("✅ Database setup complete!")
+            
+            # Refresh planner statistics for the indexes above (only re-analyzes what needs it)
+            cursor.execute('PRAGMA optimize')
+            self.load_settings_cache()
+            logger.info("✅ Database setup complete!")
             
         except Exception as e:
-            print(f"❌ Database setup error: {e}")
+            logger.error("❌ Database setup error: %s", e)
             raise
     
+    def is_healthy(self):
+        """Return the last test_connection result, re-checking at most every HEALTH_CHECK_TTL seconds"""
+        now = time.monotonic()
+        if now - self._health_checked_at >= HEALTH_CHECK_TTL:
+            self._healthy = self.test_connection()
+            self._health_checked_at = now
+        return self._healthy
+    
     def test_connection(self):
         """Test bot connection to Telegram API"""
         try:
-            response = requests.get(f"{self.base_url}getMe", timeout=10)
-            data = response.json()
+            response = self.session.get(f"{self.base_url}getMe", timeout=10)
+            data = decode_json(response.content)
             if data.get('ok'):
                 bot_info = data['result']
                 self.bot_username = bot_info['username']
-                print(f"✅ Bot connected: @{bot_info['username']} ({bot_info['first_name']})")
+                self.bot_id = bot_info['id']
+                logger.info("✅ Bot connected: @%s (%s)", bot_info['username'], bot_info['first_name'])
                 return True
             else:
-                print(f"❌ Bot connection failed: {data.get('description')}")
+                logger.error("❌ Bot connection failed: %s", data.get('description'))
                 return False
         except Exception as e:
-            print(f"❌ Connection error: {e}")
+            logger.error("❌ Connection error: %s", e)
             return False
     
     def setup_webhook(self):
@@ -378,30 +945,84 @@ class TelegramProtectionBot:
             # Get Render URL
             render_url = os.environ.get('RENDER_EXTERNAL_URL')
             if not render_url:
-                print("⚠️ RENDER_EXTERNAL_URL not set, using long polling")
+                logger.warning("⚠️ RENDER_EXTERNAL_URL not set, using long polling")
                 return False
             
             webhook_url = f"{render_url}/webhook"
-            print(f"🔗 Setting webhook to: {webhook_url}")
+            logger.info("🔗 Setting webhook to: %s", webhook_url)
             
-            response = requests.post(
+            response = self.session.post(
                 f"{self.base_url}setWebhook",
-                data={'url': webhook_url},
+                data={
+                    'url': webhook_url,
+                    'max_connections': WEBHOOK_MAX_CONNECTIONS,
+                    'allowed_updates': ALLOWED_UPDATES,
+                    'drop_pending_updates': 'true' if DROP_PENDING_UPDATES else 'false'
+                },
                 timeout=10
             )
             
-            result = response.json()
+            result = decode_json(response.content)
             if result.get('ok'):
-                print("✅ Webhook set successfully")
+                logger.info("✅ Webhook set successfully")
                 return True
             else:
-                print(f"❌ Failed to set webhook: {result.get('description')}")
+                logger.error("❌ Failed to set webhook: %s", result.get('description'))
                 return False
                 
         except Exception as e:
-            print(f"❌ Webhook setup error: {e}")
+            logger.error("❌ Webhook setup error: %s", e)
             return False
     
+    def start_long_polling(self):
+        """Start a getUpdates long-polling loop (used when no webhook is set)"""
+        def poll_updates():
+            # getUpdates is refused while a webhook is registered
+            try:
+                self.session.post(f"{self.base_url}deleteWebhook",
+                                  data={'drop_pending_updates': 'true' if DROP_PENDING_UPDATES else 'false'},
+                                  timeout=10)
+            except Exception as e:
+                logger.error("❌ Error deleting webhook: %s", e)
+            
+            params = {'timeout': LONG_POLL_TIMEOUT, 'allowed_updates': ALLOWED_UPDATES}
+            offset = 0
+            while True:
+                try:
+                    params['offset'] = offset
+                    response = self.session.get(f"{self.base_url}getUpdates", params=params,
+                                                timeout=LONG_POLL_TIMEOUT + 10)
+                    data = decode_json(response.content)
+                    if not data.get('ok'):
+                        logger.error("❌ getUpdates failed: %s", data.get('description'))
+                        time.sleep(5)
+                        continue
+                    
+                    for update in data['result']:
+                        offset = update['update_id'] + 1
+                        # Blocks while UPDATE_QUEUE_LIMIT updates are pending, throttling polling
+                        UPDATE_SLOTS.acquire()
+                        try:
+                            future = UPDATE_POOL.submit(self.process_update, update)
+                        except Exception:
+                            UPDATE_SLOTS.release()
+                            raise
+                        future.add_done_callback(lambda f: UPDATE_SLOTS.release())
+                except Exception as e:
+                    logger.error("❌ Long polling error: %s", e)
+                    time.sleep(5)
+        
+        polling_thread = threading.Thread(target=poll_updates, daemon=True)
+        polling_thread.start()
+        logger.info("✅ Long polling started!")
+    
+    def post_json(self, method, data, timeout=10):
+        """POST a Bot API call with a JSON body (encoded with orjson when available)"""
+        if orjson is not None:
+            return self.session.post(f"{self.base_url}{method}", data=orjson.dumps(data),
+                                     headers=JSON_HEADERS, timeout=timeout)
+        return self.session.post(f"{self.base_url}{method}", json=data, timeout=timeout)
+    
     def send_message(self, chat_id, text, parse_mode='HTML', reply_markup=None):
         """Send message to Telegram chat"""
         try:
@@ -412,12 +1033,12 @@ class TelegramProtectionBot:
             }
             
             if reply_markup:
-                data['reply_markup'] = json.dumps(reply_markup)
+                data['reply_markup'] = reply_markup
             
-            response = requests.post(f"{self.base_url}sendMessage", data=data, timeout=10)
-            return response.json()
+            response = self.post_json('sendMessage', data)
+            return decode_json(response.content)
         except Exception as e:
-            print(f"❌ Error sending message: {e}")
+            logger.error("❌ Error sending message: %s", e)
             return None
     
     def edit_message_text(self, chat_id, message_id, text, parse_mode='HTML', reply_markup=None):
@@ -431,12 +1052,12 @@ class TelegramProtectionBot:
             }
             
             if reply_markup:
-                data['reply_markup'] = json.dumps(reply_markup)
+                data['reply_markup'] = reply_markup
             
-            response = requests.post(f"{self.base_url}editMessageText", data=data, timeout=10)
-            return response.json()
+            response = self.post_json('editMessageText', data)
+            return decode_json(response.content)
         except Exception as e:
-            print(f"❌ Error editing message: {e}")
+            logger.error("❌ Error editing message: %s", e)
             return None
     
     def answer_callback_query(self, callback_query_id, text=None, show_alert=False):
@@ -451,12 +1072,26 @@ class TelegramProtectionBot:
             if show_alert:
                 data['show_alert'] = show_alert
             
-            response = requests.post(f"{self.base_url}answerCallbackQuery", data=data, timeout=10)
-            return response.json()
+            response = self.post_json('answerCallbackQuery', data)
+            return decode_json(response.content)
         except Exception as e:
-            print(f"❌ Error answering callback: {e}")
+            logger.error("❌ Error answering callback: %s", e)
             return None
     
+    def post_with_flood_wait(self, method, data):
+        """POST to the Bot API, waiting out one flood-control (429) response"""
+        response = self.session.post(f"{self.base_url}{method}", data=data, timeout=10)
+        result = decode_json(response.content)
+        
+        retry_after = result.get('parameters', {}).get('retry_after')
+        if retry_after:
+            logger.warning("⏳ Rate limited on %s, retrying in %ss", method, retry_after)
+            time.sleep(retry_after)
+            response = self.session.post(f"{self.base_url}{method}", data=data, timeout=10)
+            result = decode_json(response.content)
+        
+        return result
+    
     def delete_message(self, chat_id, message_id):
         """Delete a message from chat"""
         try:
@@ -465,34 +1100,66 @@ class TelegramProtectionBot:
                 'message_id': message_id
             }
             
-            response = requests.post(f"{self.base_url}deleteMessage", data=data, timeout=10)
-            result = response.json()
+            result = self.post_with_flood_wait('deleteMessage', data)
             
             if result.get('ok'):
-                print(f"✅ Deleted message {message_id} from {chat_id}")
-                # Update stats
-                cursor = self.conn.cursor()
-                cursor.execute('UPDATE bot_stats SET total_posts_deleted = total_posts_deleted + 1 WHERE id = 1')
-                self.conn.commit()
+                logger.info("✅ Deleted message %s from %s", message_id, chat_id)
+                with self._write_cond:  # may run on several api_pool threads at once
+                    self._stats.posts_deleted += 1
                 return True
             else:
-                print(f"❌ Failed to delete message: {result.get('description')}")
+                logger.error("❌ Failed to delete message: %s", result.get('description'))
                 return False
         except Exception as e:
-            print(f"❌ Error deleting message: {e}")
+            logger.error("❌ Error deleting message: %s", e)
+            return False
+    
+    def delete_messages(self, chat_id, message_ids):
+        """Delete several messages from a chat in one request"""
+        try:
+            data = {
+                'chat_id': chat_id,
+                'message_ids': json.dumps(message_ids)
+            }
+            
+            result = self.post_with_flood_wait('deleteMessages', data)
+            
+            if result.get('ok'):
+                logger.info("✅ Deleted %d messages from %s", len(message_ids), chat_id)
+                # deleteMessages returns ok even when it skips IDs that are already gone, so
+                # posts_deleted counts messages sent for deletion, not confirmed deletions
+                with self._write_cond:
+                    self._stats.posts_deleted += len(message_ids)
+                return True
+            else:
+                logger.error("❌ Failed to delete messages: %s", result.get('description'))
+                return False
+        except Exception as e:
+            logger.error("❌ Error deleting messages: %s", e)
             return False
     
     def get_chat(self, chat_id):
         """Get chat information"""
         try:
-            response = requests.post(f"{self.base_url}getChat", 
-                                   data={'chat_id': chat_id}, 
-                                   timeout=10)
-            result = response.json()
+            response = self.session.post(f"{self.base_url}getChat", 
+                                        data={'chat_id': chat_id}, 
+                                        timeout=10)
+            result = decode_json(response.content)
             return result.get('result') if result.get('ok') else None
         except:
             return None
     
+    def get_chat_cached(self, chat_id):
+        """Get chat information, reusing a result for CHAT_INFO_TTL seconds"""
+        cached = self.chat_info_cache.get(chat_id)
+        if cached and cached[0] > time.monotonic():
+            return cached[1]
+        
+        chat_info = self.get_chat(chat_id)
+        if chat_info:
+            self.chat_info_cache[chat_id] = (time.monotonic() + CHAT_INFO_TTL, chat_info)
+        return chat_info
+    
     def get_chat_member(self, chat_id, user_id):
         """Get chat member information"""
         try:
@@ -500,30 +1167,52 @@ class TelegramProtectionBot:
                 'chat_id': chat_id,
                 'user_id': user_id
             }
-            response = requests.post(f"{self.base_url}getChatMember", data=data, timeout=10)
-            result = response.json()
+            response = self.session.post(f"{self.base_url}getChatMember", data=data, timeout=10)
+            result = decode_json(response.content)
             return result.get('result') if result.get('ok') else None
         except:
             return None
     
     def is_user_admin_in_channel(self, chat_id, user_id):
         """Check if user is admin in a channel"""
-        cache_key = f"{chat_id}_{user_id}"
-        if cache_key in self.channel_cache:
-            return self.channel_cache[cache_key]
+        cache_key = (chat_id, user_id)
+        with self.channel_cache_lock:
+            cached = self.channel_cache.get(cache_key)
+            if cached and cached[0] > time.monotonic():
+                self.channel_cache.move_to_end(cache_key)
+                return cached[1]
         
         try:
             member = self.get_chat_member(chat_id, user_id)
             if member:
                 status = member.get('status', '')
                 is_admin = status in ['creator', 'administrator']
-                self.channel_cache[cache_key] = is_admin
+                self.cache_admin_status(cache_key, is_admin)
                 return is_admin
         except:
             pass
         
         return False
     
+    def cache_admin_status(self, cache_key, is_admin):
+        """Store an admin check result in the TTL LRU channel cache"""
+        with self.channel_cache_lock:
+            self.channel_cache[cache_key] = (time.monotonic() + CHANNEL_CACHE_TTL, is_admin)
+            self.channel_cache.move_to_end(cache_key)
+            if len(self.channel_cache) > CHANNEL_CACHE_SIZE:
+                self.channel_cache.popitem(last=False)
+    
+    def handle_chat_member_update(self, member_update):
+        """Refresh the bot's cached admin status when Telegram reports a change to it"""
+        chat_id = member_update['chat']['id']
+        new_member = member_update.get('new_chat_member', {})
+        user_id = new_member.get('user', {}).get('id')
+        # Only the bot's own entries are ever read from channel_cache
+        if user_id and user_id == self.get_bot_id():
+            is_admin = new_member.get('status') in ['creator', 'administrator']
+            self.cache_admin_status((chat_id, user_id), is_admin)
+            logger.debug("👥 Member %s in %s is now %s", user_id, chat_id, new_member.get('status'))
+    
     def is_bot_admin_in_channel(self, chat_id):
         """Check if bot is admin in a channel"""
         bot_id = self.get_bot_id()
@@ -532,16 +1221,45 @@ class TelegramProtectionBot:
         return False
     
     def get_bot_id(self):
-        """Get bot user ID"""
+        """Get bot user ID (fetched from getMe once, then remembered)"""
+        if self.bot_id:
+            return self.bot_id
+        
         try:
-            response = requests.get(f"{self.base_url}getMe", timeout=5)
-            data = response.json()
+            response = self.session.get(f"{self.base_url}getMe", timeout=5)
+            data = decode_json(response.content)
             if data.get('ok'):
-                return data['result']['id']
+                self.bot_id = data['result']['id']
+                return self.bot_id
         except:
             pass
         return None
     
+    def process_raw_update(self, body):
+        """Decode a raw webhook body and process the update"""
+        try:
+            update = decode_json(body)
+        except ValueError as e:
+            logger.error("❌ Invalid update JSON: %s", e)
+            return
+        
+        if update:
+            self.process_update(update)
+    
+    def handle_addadmin_command(self, message, args):
+        """Handle /addadmin <user_id> (without an ID it just shows the main menu)"""
+        args = args.split()
+        if not args:
+            self.show_main_menu(message)
+            return
+        
+        try:
+            admin_id = int(args[0])
+        except ValueError:
+            self.send_message(message['chat']['id'], "❌ Invalid admin ID. Please use a number.")
+            return
+        self.add_admin_direct(message, admin_id)
+    
     def process_update(self, update):
         """Process incoming update from webhook"""
         try:
@@ -552,7 +1270,7 @@ class TelegramProtectionBot:
                 message = callback_query.get('message', {})
                 from_user = callback_query.get('from', {})
                 
-                print(f"🔘 Processing callback: {callback_data}")
+                logger.debug("🔘 Processing callback: %s", callback_data)
                 
                 # Answer callback query first
                 self.answer_callback_query(callback_query['id'])
@@ -561,17 +1279,29 @@ class TelegramProtectionBot:
                 self.process_callback_data(callback_data, message, from_user)
                 return
             
+            # The bot's own rights changed in a chat
+            member_update = update.get('my_chat_member')
+            if member_update:
+                self.handle_chat_member_update(member_update)
+                return
+            
             # Handle messages
             if 'message' in update:
                 message = update['message']
                 chat_id = message['chat']['id']
                 user_id = message['from']['id'] if 'from' in message else None
                 
-                print(f"📩 Received message in chat {chat_id}")
+                logger.debug("📩 Received message in chat %s", chat_id)
+                
+                # Strangers in private chats only get the command handlers' "not authorized"
+                # replies, anything else they send needs no further work
+                if (message['chat'].get('type') == 'private' and not self.is_authorized_user(user_id)
+                        and not message.get('text', '').startswith('/')):
+                    return
                 
                 # Check if user is in a state waiting for input
-                if user_id and user_id in self.user_states:
-                    state_info = self.user_states[user_id]
+                state_info = self.get_user_state(user_id) if user_id else None
+                if state_info:
                     if state_info['state'] == 'waiting_for_admin_id' and 'text' in message:
                         self.process_admin_id_input(message, user_id)
                         return
@@ -581,22 +1311,13 @@ class TelegramProtectionBot:
                     text = message['text']
                     
                     if text.startswith('/'):
-                        command = text.split(' ')[0].lower()
-                        print(f"🔧 Processing command: {command}")
+                        command, _, args = text.partition(' ')
+                        command = command.lower()
+                        logger.debug("🔧 Processing command: %s", command)
                         
-                        if command == '/start':
-                            self.handle_start(message)
-                        elif command == '/menu':
-                            self.show_main_menu(message)
-                        elif command == '/help':
-                            self.show_help_menu(message)
-                        elif command == '/addadmin' and len(text.split()) > 1:
-                            # Handle /addadmin command with ID
-                            try:
-                                admin_id = int(text.split()[1])
-                                self.add_admin_direct(message, admin_id)
-                            except ValueError:
-                                self.send_message(chat_id, "❌ Invalid admin ID. Please use a number.")
+                        handler = self.command_handlers.get(command)
+                        if handler:
+                            handler(message, args)
                         else:
                             self.show_main_menu(message)
                     else:
@@ -610,17 +1331,16 @@ class TelegramProtectionBot:
             
             # Handle channel posts
             elif 'channel_post' in update:
-                print("📢 Processing channel post")
+                logger.debug("📢 Processing channel post")
                 self.handle_channel_post(update['channel_post'])
             
             # Handle message edits
             elif 'edited_message' in update:
-                print("📝 Processing edited message")
+                logger.debug("📝 Processing edited message")
                 self.handle_edited_message(update['edited_message'])
                     
         except Exception as e:
-            print(f"❌ Error processing update: {e}")
-            traceback.print_exc()
+            logger.exception("❌ Error processing update: %s", e)
     
     def process_callback_data(self, callback_data, message, from_user):
         """Process callback data from inline buttons"""
@@ -636,62 +1356,34 @@ class TelegramProtectionBot:
                     reply_markup=self.get_back_button())
                 return
             
-            if callback_data == 'main_menu':
-                self.show_main_menu_via_callback(chat_id, message_id)
-            
-            elif callback_data == 'admins_menu':
-                self.show_admins_menu(chat_id, message_id)
-            
-            elif callback_data == 'add_admin':
-                self.show_add_admin_menu(chat_id, message_id)
-            
-            elif callback_data == 'list_admins':
-                self.show_list_admins(chat_id, message_id)
-            
-            elif callback_data == 'remove_admin':
-                self.show_remove_admin_menu(chat_id, message_id)
-            
-            elif callback_data == 'time_menu':
-                self.show_time_menu(chat_id, message_id)
-            
-            elif callback_data.startswith('set_time_'):
-                time_key = callback_data.replace('set_time_', '')
-                self.set_global_delete_time(chat_id, message_id, time_key, user_id)
-            
-            elif callback_data.startswith('admin_time_'):
-                parts = callback_data.replace('admin_time_', '').split('_')
-                if len(parts) == 2:
-                    admin_id = int(parts[0])
-                    time_key = parts[1]
-                    self.set_admin_delete_time(chat_id, message_id, admin_id, time_key, user_id)
-            
-            elif callback_data.startswith('select_admin_'):
-                admin_id = int(callback_data.replace('select_admin_', ''))
-                self.show_admin_time_menu(chat_id, message_id, admin_id)
-            
-            elif callback_data.startswith('delete_admin_'):
-                admin_id = int(callback_data.replace('delete_admin_', ''))
-                self.delete_admin(chat_id, message_id, admin_id, user_id)
-            
-            elif callback_data == 'stats_menu':
-                self.show_stats(chat_id, message_id)
-            
-            elif callback_data == 'help_menu':
-                self.show_help(chat_id, message_id)
-            
-            elif callback_data == 'confirm_add_admin':
-                self.request_admin_id(chat_id, message_id, user_id)
-            
-            elif callback_data.startswith('process_admin_id_'):
-                target_user_id = int(callback_data.replace('process_admin_id_', ''))
-                self.add_admin(chat_id, message_id, target_user_id, user_id)
+            # Exact matches first, then the short list of prefixed callbacks
+            handler = self.callback_handlers.get(callback_data)
+            if handler:
+                handler(chat_id, message_id, user_id)
+                return
             
-            elif callback_data == 'back':
-                self.show_main_menu_via_callback(chat_id, message_id)
+            for prefix, prefix_handler in self.callback_prefix_handlers:
+                if callback_data.startswith(prefix):
+                    prefix_handler(chat_id, message_id, user_id, callback_data[len(prefix):])
+                    return
             
         except Exception as e:
-            print(f"❌ Error processing callback: {e}")
-            traceback.print_exc()
+            logger.exception("❌ Error processing callback: %s", e)
+    
+    def handle_admin_time_callback(self, chat_id, message_id, user_id, suffix):
+        """Handle admin_time_<admin_id>_<time_key> callbacks"""
+        parts = suffix.split('_')
+        if len(parts) == 2:
+            self.set_admin_delete_time(chat_id, message_id, int(parts[0]), parts[1], user_id)
+    
+    def get_user_state(self, user_id):
+        """Get a user's pending input state, dropping it once it has expired"""
+        with self.user_states_lock:
+            state_info = self.user_states.get(user_id)
+            if state_info and state_info['expires_at'] <= time.monotonic():
+                del self.user_states[user_id]
+                return None
+            return state_info
     
     def process_admin_id_input(self, message, user_id):
         """Process admin ID input from user"""
@@ -699,8 +1391,8 @@ class TelegramProtectionBot:
         text = message['text'].strip()
         
         # Clear user state
-        if user_id in self.user_states:
-            del self.user_states[user_id]
+        with self.user_states_lock:
+            self.user_states.pop(user_id, None)
         
         try:
             admin_id = int(text)
@@ -722,20 +1414,12 @@ class TelegramProtectionBot:
             return
         
         try:
-            cursor = self.conn.cursor()
-            
             # Check if already an admin
-            cursor.execute('SELECT id, first_name FROM channel_admins WHERE user_id = ? AND is_active = 1', (admin_id,))
-            existing = cursor.fetchone()
+            existing = self.get_read_conn().execute(
+                'SELECT id, first_name FROM channel_admins WHERE user_id = ? AND is_active = 1', (admin_id,)).fetchone()
             
             if existing:
-                success_text = f"""✅ <b>Already Protected</b>
-
-User ID: {admin_id}
-Name: {existing[1]}
-Status: Already a protected admin
-
-Their posts will NOT be auto-deleted."""
+                success_text = ALREADY_PROTECTED_TEXT.format(admin_id=admin_id, name=existing[1])
                 
                 keyboard = {
                     'inline_keyboard': [
@@ -748,27 +1432,21 @@ Their posts will NOT be auto-deleted."""
                 return
             
             # Add to database
-            first_name = f"User{admin_id}"
-            cursor.execute('''
-                INSERT INTO channel_admins 
-                (user_id, first_name, added_by, delete_after_seconds, is_active)
-                VALUES (?, ?, ?, 0, 1)
-            ''', (admin_id, first_name, user_id))
-            
-            cursor.execute('UPDATE bot_stats SET total_admins_added = total_admins_added + 1 WHERE id = 1')
-            self.conn.commit()
+            first_name = f"User{admin_id}"
+            with self.write_lock:
+                self.conn.execute('''
+                    INSERT INTO channel_admins 
+                    (user_id, first_name, added_by, delete_after_seconds, is_active)
+                    VALUES (?, ?, ?, 0, 1)
+                    ON CONFLICT(user_id) DO UPDATE SET 
+                        added_by = excluded.added_by, 
+                        delete_after_seconds = 0, 
+                        is_active = 1
+                ''', (admin_id, first_name, user_id))
+                self.conn.commit()
+            self._admin_cache[admin_id] = 0
             
-            success_text = f"""✅ <b>Admin Added Successfully!</b>
-
-👤 User ID: {admin_id}
-👑 Added by: Bot Owner
-⏰ Default Delete Time: Never (protected)
-
-📝 <b>What this means:</b>
-• This user can now post without auto-deletion
-• Their posts are protected
-• You can set custom delete time per admin
-• Other users' posts will still be deleted"""
+            success_text = ADMIN_ADDED_TEXT.format(admin_id=admin_id)
             
             keyboard = {
                 'inline_keyboard': [
@@ -780,20 +1458,15 @@ Their posts will NOT be auto-deleted."""
             }
             
             self.send_message(chat_id, success_text, reply_markup=keyboard)
-            print(f"✅ Added user {admin_id} as protected admin")
+            logger.info("✅ Added user %s as protected admin", admin_id)
             
-            # Also send notification to all bot owners
-            for owner_id in self.owner_ids:
-                if owner_id != user_id:  # Don't notify the person who added
-                    try:
-                        notification = f"""👑 <b>New Admin Added</b>
+            # Also notify the other bot owners (sent by the rate-limited notifier)
+            notification = f"""👑 <b>New Admin Added</b>
 
 User ID: {admin_id}
 Added by: {message['from'].get('first_name', 'A bot owner')}
-Time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"""
-                        self.send_message(owner_id, notification)
-                    except:
-                        pass
+Time: {format_now()}"""
+            self.notify_owners(notification, exclude=user_id)
             
         except Exception as e:
             error_text = f"""❌ <b>Error Adding Admin</b>
@@ -804,7 +1477,7 @@ Please try again or contact support."""
             
             keyboard = self.get_back_button()
             self.send_message(chat_id, error_text, reply_markup=keyboard)
-            print(f"❌ Error adding admin: {e}")
+            logger.error("❌ Error adding admin: %s", e)
     
     def handle_start(self, message):
         """Handle /start command"""
@@ -812,7 +1485,7 @@ Please try again or contact support."""
         user_id = message['from']['id']
         first_name = message['from'].get('first_name', 'User')
         
-        print(f"👋 Handling /start from {first_name} ({user_id})")
+        logger.info("👋 Handling /start from %s (%s)", first_name, user_id)
         
         if not self.is_authorized_user(user_id):
             self.send_message(chat_id, 
@@ -822,19 +1495,7 @@ Please try again or contact support."""
                 f"Only bot owners can access the controls.")
             return
         
-        welcome_text = f"""👋 Welcome {first_name}!
-
-🤖 <b>Channel Protection Bot</b>
-
-I protect your channels by:
-• 🚫 Auto-deleting posts from non-admins
-• 🔔 Notifying about comments/replies
-• ⏰ Scheduling deletions with inline buttons
-
-👑 <b>Bot Owners:</b> {len(self.owner_ids)} users
-🔧 <b>Status:</b> ✅ Active and ready
-
-Use the buttons below to control the bot:"""
+        welcome_text = WELCOME_TEXT.format(first_name=first_name, owner_count=len(self.owner_ids))
         
         keyboard = self.get_main_menu_keyboard()
         self.send_message(chat_id, welcome_text, reply_markup=keyboard)
@@ -878,16 +1539,7 @@ Manage protected admins:
 
 Select an option:"""
         
-        keyboard = {
-            'inline_keyboard': [
-                [{'text': '➕ Add Admin', 'callback_data': 'add_admin'}],
-                [{'text': '📋 List Admins', 'callback_data': 'list_admins'}],
-                [{'text': '🗑️ Remove Admin', 'callback_data': 'remove_admin'}],
-                [{'text': '🔙 Back to Main', 'callback_data': 'main_menu'}]
-            ]
-        }
-        
-        self.edit_message_text(chat_id, message_id, menu_text, reply_markup=keyboard)
+        self.edit_message_text(chat_id, message_id, menu_text, reply_markup=ADMINS_MENU_KEYBOARD)
     
     def show_add_admin_menu(self, chat_id, message_id):
         """Show add admin menu"""
@@ -897,13 +1549,7 @@ To add a protected admin, you need their Telegram User ID.
 
 What would you like to do?"""
         
-        keyboard = {
-            'inline_keyboard': [
-                [{'text': '📝 Enter User ID Manually', 'callback_data': 'confirm_add_admin'}],
-                [{'text': '❓ How to Get User ID', 'callback_data': 'help_menu'}],
-                [{'text': '🔙 Back to Admins Menu', 'callback_data': 'admins_menu'}]
-            ]
-        }
+        keyboard = ADD_ADMIN_MENU_KEYBOARD
         
         self.edit_message_text(chat_id, message_id, menu_text, reply_markup=keyboard)
     
@@ -921,29 +1567,23 @@ Format: Just send the number (e.g., 123456789)
         self.edit_message_text(chat_id, message_id, menu_text, reply_markup=keyboard)
         
         # Set user state to waiting for admin ID
-        self.user_states[user_id] = {
-            'state': 'waiting_for_admin_id',
-            'chat_id': chat_id
-        }
-        print(f"✅ Set state for user {user_id}: waiting_for_admin_id")
+        with self.user_states_lock:
+            self.user_states[user_id] = {
+                'state': 'waiting_for_admin_id',
+                'chat_id': chat_id,
+                'expires_at': time.monotonic() + USER_STATE_TTL
+            }
+        logger.info("✅ Set state for user %s: waiting_for_admin_id", user_id)
     
     def add_admin(self, chat_id, message_id, target_user_id, added_by):
         """Add a new admin (via callback with pre-set ID)"""
         try:
-            cursor = self.conn.cursor()
-            
             # Check if already an admin
-            cursor.execute('SELECT id, first_name FROM channel_admins WHERE user_id = ? AND is_active = 1', (target_user_id,))
-            existing = cursor.fetchone()
+            existing = self.get_read_conn().execute(
+                'SELECT id, first_name FROM channel_admins WHERE user_id = ? AND is_active = 1', (target_user_id,)).fetchone()
             
             if existing:
-                success_text = f"""✅ <b>Already Protected</b>
-
-User ID: {target_user_id}
-Name: {existing[1]}
-Status: Already a protected admin
-
-Their posts will NOT be auto-deleted."""
+                success_text = ALREADY_PROTECTED_TEXT.format(admin_id=target_user_id, name=existing[1])
                 
                 keyboard = {
                     'inline_keyboard': [
@@ -957,26 +1597,20 @@ Their posts will NOT be auto-deleted."""
             
             # Add to database
             first_name = f"User{target_user_id}"
-            cursor.execute('''
-                INSERT INTO channel_admins 
-                (user_id, first_name, added_by, delete_after_seconds, is_active)
-                VALUES (?, ?, ?, 0, 1)
-            ''', (target_user_id, first_name, added_by))
-            
-            cursor.execute('UPDATE bot_stats SET total_admins_added = total_admins_added + 1 WHERE id = 1')
-            self.conn.commit()
+            with self.write_lock:
+                self.conn.execute('''
+                    INSERT INTO channel_admins 
+                    (user_id, first_name, added_by, delete_after_seconds, is_active)
+                    VALUES (?, ?, ?, 0, 1)
+                    ON CONFLICT(user_id) DO UPDATE SET 
+                        added_by = excluded.added_by, 
+                        delete_after_seconds = 0, 
+                        is_active = 1
+                ''', (target_user_id, first_name, added_by))
+                self.conn.commit()
+            self._admin_cache[target_user_id] = 0
             
-            success_text = f"""✅ <b>Admin Added Successfully!</b>
-
-👤 User ID: {target_user_id}
-👑 Added by: Bot Owner
-⏰ Default Delete Time: Never (protected)
-
-📝 <b>What this means:</b>
-• This user can now post without auto-deletion
-• Their posts are protected
-• You can set custom delete time per admin
-• Other users' posts will still be deleted"""
+            success_text = ADMIN_ADDED_TEXT.format(admin_id=target_user_id)
             
             keyboard = {
                 'inline_keyboard': [
@@ -987,7 +1621,7 @@ Their posts will NOT be auto-deleted."""
             }
             
             self.edit_message_text(chat_id, message_id, success_text, reply_markup=keyboard)
-            print(f"✅ Added user {target_user_id} as protected admin")
+            logger.info("✅ Added user %s as protected admin", target_user_id)
             
         except Exception as e:
             error_text = f"""❌ <b>Error Adding Admin</b>
@@ -998,13 +1632,13 @@ Please try again or contact support."""
             
             keyboard = self.get_back_button()
             self.edit_message_text(chat_id, message_id, error_text, reply_markup=keyboard)
-            print(f"❌ Error adding admin: {e}")
+            logger.error("❌ Error adding admin: %s", e)
     
     def show_list_admins(self, chat_id, message_id):
         """Show list of all protected admins"""
-        cursor = self.conn.cursor()
+        cursor = self.get_read_conn().cursor()
         cursor.execute('''
-            SELECT user_id, first_name, delete_after_seconds, added_at 
+            SELECT user_id, first_name, delete_after_seconds, date(added_at) 
             FROM channel_admins 
             WHERE is_active = 1 
             ORDER BY added_at DESC
@@ -1018,32 +1652,18 @@ Please try again or contact support."""
 There are no protected admins yet.
 Add your first admin using the button below."""
             
-            keyboard = {
-                'inline_keyboard': [
-                    [{'text': '➕ Add First Admin', 'callback_data': 'add_admin'}],
-                    [{'text': '🔙 Back to Main', 'callback_data': 'main_menu'}]
-                ]
-            }
+            keyboard = NO_ADMINS_KEYBOARD
         else:
-            admin_list = "👑 <b>Protected Admins</b>\n\n"
-            
-            for i, admin in enumerate(admins, 1):
-                user_id, first_name, delete_seconds, added_at = admin
-                added_date = datetime.fromisoformat(added_at).strftime('%Y-%m-%d')
-                
-                # Format delete time
-                if delete_seconds == 0:
-                    delete_time = "Never"
-                else:
-                    delete_time = self.format_seconds(delete_seconds)
-                
-                admin_list += f"{i}. {first_name}\n"
-                admin_list += f"   🆔: {user_id}\n"
-                admin_list += f"   ⏰: {delete_time}\n"
-                admin_list += f"   📅: {added_date}\n\n"
-            
-            admin_list += f"<i>Total: {len(admins)} protected admin(s)</i>"
-            menu_text = admin_list
+            parts = ["👑 <b>Protected Admins</b>\n\n"]
+            parts.extend(
+                f"{i}. {first_name}\n"
+                f"   🆔: {user_id}\n"
+                f"   ⏰: {self.format_seconds(delete_seconds) if delete_seconds else 'Never'}\n"
+                f"   📅: {added_date}\n\n"
+                for i, (user_id, first_name, delete_seconds, added_date) in enumerate(admins, 1)
+            )
+            parts.append(f"<i>Total: {len(admins)} protected admin(s)</i>")
+            menu_text = "".join(parts)
             
             # Create buttons for each admin
             keyboard_rows = []
@@ -1061,7 +1681,7 @@ Add your first admin using the button below."""
     
     def show_admin_time_menu(self, chat_id, message_id, admin_id):
         """Show time menu for a specific admin"""
-        cursor = self.conn.cursor()
+        cursor = self.get_read_conn().cursor()
         cursor.execute('SELECT first_name, delete_after_seconds FROM channel_admins WHERE user_id = ?', (admin_id,))
         admin = cursor.fetchone()
         
@@ -1079,32 +1699,27 @@ Add your first admin using the button below."""
 
 Select new delete time for this admin:"""
             
-            keyboard = {
-                'inline_keyboard': [
-                    [{'text': '30 Seconds', 'callback_data': f'admin_time_{admin_id}_30s'}],
-                    [{'text': '1 Minute', 'callback_data': f'admin_time_{admin_id}_1m'}],
-                    [{'text': '5 Minutes', 'callback_data': f'admin_time_{admin_id}_5m'}],
-                    [{'text': '10 Minutes', 'callback_data': f'admin_time_{admin_id}_10m'}],
-                    [{'text': '1 Hour', 'callback_data': f'admin_time_{admin_id}_1h'}],
-                    [{'text': '2 Hours', 'callback_data': f'admin_time_{admin_id}_2h'}],
-                    [{'text': '12 Hours', 'callback_data': f'admin_time_{admin_id}_12h'}],
-                    [{'text': '24 Hours', 'callback_data': f'admin_time_{admin_id}_24h'}],
-                    [{'text': '❌ Never (Protected)', 'callback_data': f'admin_time_{admin_id}_never'}],
-                    [{'text': '🗑️ Remove This Admin', 'callback_data': f'delete_admin_{admin_id}'}],
-                    [{'text': '🔙 Back to Admin List', 'callback_data': 'list_admins'}]
-                ]
-            }
+            keyboard = build_admin_time_keyboard(admin_id)
         
         self.edit_message_text(chat_id, message_id, menu_text, reply_markup=keyboard)
     
     def set_admin_delete_time(self, chat_id, message_id, admin_id, time_key, user_id):
         """Set delete time for a specific admin"""
         try:
-            seconds = DELETE_TIME_OPTIONS.get(time_key, 0)
+            seconds = DELETE_TIME_OPTIONS.get(time_key)
+            if seconds is None:
+                self.edit_message_text(chat_id, message_id, 
+                    "❌ Invalid time option.",
+                    reply_markup=self.get_back_button())
+                return
             
-            cursor = self.conn.cursor()
-            cursor.execute('SELECT first_name FROM channel_admins WHERE user_id = ?', (admin_id,))
-            admin = cursor.fetchone()
+            with self.write_lock:
+                admin = self.conn.execute(
+                    'UPDATE channel_admins SET delete_after_seconds = ? WHERE user_id = ? RETURNING first_name',
+                    (seconds, admin_id)).fetchone()
+                self.conn.commit()
+            if admin_id in self._admin_cache:
+                self._admin_cache[admin_id] = seconds
             
             if not admin:
                 self.edit_message_text(chat_id, message_id, 
@@ -1113,9 +1728,6 @@ Select new delete time for this admin:"""
                 return
             
             first_name = admin[0]
-            cursor.execute('UPDATE channel_admins SET delete_after_seconds = ? WHERE user_id = ?', 
-                         (seconds, admin_id))
-            self.conn.commit()
             
             time_text = self.format_seconds(seconds) if seconds > 0 else "Never (protected)"
             
@@ -1139,20 +1751,23 @@ Select new delete time for this admin:"""
             }
             
             self.edit_message_text(chat_id, message_id, success_text, reply_markup=keyboard)
-            print(f"✅ Set delete time for admin {admin_id} to {time_key}")
+            logger.info("✅ Set delete time for admin %s to %s", admin_id, time_key)
             
         except Exception as e:
             self.edit_message_text(chat_id, message_id,
                 f"❌ Error updating delete time: {str(e)}",
                 reply_markup=self.get_back_button())
-            print(f"❌ Error setting admin delete time: {e}")
+            logger.error("❌ Error setting admin delete time: %s", e)
     
     def delete_admin(self, chat_id, message_id, admin_id, user_id):
         """Delete an admin"""
         try:
-            cursor = self.conn.cursor()
-            cursor.execute('SELECT first_name FROM channel_admins WHERE user_id = ?', (admin_id,))
-            admin = cursor.fetchone()
+            with self.write_lock:
+                admin = self.conn.execute(
+                    'UPDATE channel_admins SET is_active = 0 WHERE user_id = ? RETURNING first_name',
+                    (admin_id,)).fetchone()
+                self.conn.commit()
+            self._admin_cache.pop(admin_id, None)
             
             if not admin:
                 self.edit_message_text(chat_id, message_id,
@@ -1161,8 +1776,6 @@ Select new delete time for this admin:"""
                 return
             
             first_name = admin[0]
-            cursor.execute('UPDATE channel_admins SET is_active = 0 WHERE user_id = ?', (admin_id,))
-            self.conn.commit()
             
             success_text = f"""🗑️ <b>Admin Removed</b>
 
@@ -1175,26 +1788,20 @@ Select new delete time for this admin:"""
 • They are removed from protected admins list
 • Their posts follow global delete time settings"""
             
-            keyboard = {
-                'inline_keyboard': [
-                    [{'text': '📋 View Remaining Admins', 'callback_data': 'list_admins'}],
-                    [{'text': '➕ Add New Admin', 'callback_data': 'add_admin'}],
-                    [{'text': '🔙 Main Menu', 'callback_data': 'main_menu'}]
-                ]
-            }
+            keyboard = ADMIN_REMOVED_KEYBOARD
             
             self.edit_message_text(chat_id, message_id, success_text, reply_markup=keyboard)
-            print(f"✅ Removed admin {admin_id}")
+            logger.info("✅ Removed admin %s", admin_id)
             
         except Exception as e:
             self.edit_message_text(chat_id, message_id,
                 f"❌ Error removing admin: {str(e)}",
                 reply_markup=self.get_back_button())
-            print(f"❌ Error removing admin: {e}")
+            logger.error("❌ Error removing admin: %s", e)
     
     def show_remove_admin_menu(self, chat_id, message_id):
         """Show remove admin menu"""
-        cursor = self.conn.cursor()
+        cursor = self.get_read_conn().cursor()
         cursor.execute('SELECT user_id, first_name FROM channel_admins WHERE is_active = 1 ORDER BY first_name')
         admins = cursor.fetchall()
         
@@ -1204,12 +1811,7 @@ Select new delete time for this admin:"""
 There are no protected admins to remove.
 Add some admins first."""
             
-            keyboard = {
-                'inline_keyboard': [
-                    [{'text': '➕ Add First Admin', 'callback_data': 'add_admin'}],
-                    [{'text': '🔙 Back to Admins Menu', 'callback_data': 'admins_menu'}]
-                ]
-            }
+            keyboard = REMOVE_NO_ADMINS_KEYBOARD
         else:
             menu_text = """🗑️ <b>Remove Admin</b>
 
@@ -1231,10 +1833,7 @@ Select an admin to remove from protection:
     
     def show_time_menu(self, chat_id, message_id):
         """Show global delete time menu"""
-        cursor = self.conn.cursor()
-        cursor.execute('SELECT global_delete_seconds FROM global_settings WHERE id = 1')
-        result = cursor.fetchone()
-        current_seconds = result[0] if result else 86400
+        current_seconds = self._global_delete_seconds
         current_time = self.format_seconds(current_seconds)
         
         menu_text = f"""⏰ <b>Global Delete Time Settings</b>
@@ -1246,30 +1845,24 @@ Protected admins have individual settings.
 
 Select new global delete time:"""
         
-        keyboard = {
-            'inline_keyboard': [
-                [{'text': '30 Seconds', 'callback_data': 'set_time_30s'}],
-                [{'text': '1 Minute', 'callback_data': 'set_time_1m'}],
-                [{'text': '5 Minutes', 'callback_data': 'set_time_5m'}],
-                [{'text': '10 Minutes', 'callback_data': 'set_time_10m'}],
-                [{'text': '1 Hour', 'callback_data': 'set_time_1h'}],
-                [{'text': '2 Hours', 'callback_data': 'set_time_2h'}],
-                [{'text': '12 Hours', 'callback_data': 'set_time_12h'}],
-                [{'text': '24 Hours', 'callback_data': 'set_time_24h'}],
-                [{'text': '🔙 Back to Main', 'callback_data': 'main_menu'}]
-            ]
-        }
+        keyboard = TIME_MENU_KEYBOARD
         
         self.edit_message_text(chat_id, message_id, menu_text, reply_markup=keyboard)
     
     def set_global_delete_time(self, chat_id, message_id, time_key, user_id):
         """Set global delete time"""
         try:
-            seconds = DELETE_TIME_OPTIONS.get(time_key, 86400)
+            seconds = DELETE_TIME_OPTIONS.get(time_key)
+            if seconds is None:
+                self.edit_message_text(chat_id, message_id, 
+                    "❌ Invalid time option.",
+                    reply_markup=self.get_back_button())
+                return
             
-            cursor = self.conn.cursor()
-            cursor.execute('UPDATE global_settings SET global_delete_seconds = ? WHERE id = 1', (seconds,))
-            self.conn.commit()
+            with self.write_lock:
+                self.conn.execute('UPDATE global_settings SET global_delete_seconds = ? WHERE id = 1', (seconds,))
+                self.conn.commit()
+            self._global_delete_seconds = seconds
             
             time_text = self.format_seconds(seconds)
             
@@ -1283,59 +1876,37 @@ Select new global delete time:"""
 • New posts will use this setting immediately
 • Existing scheduled posts will use their original settings"""
             
-            keyboard = {
-                'inline_keyboard': [
-                    [{'text': '⚙️ Back to Time Settings', 'callback_data': 'time_menu'}],
-                    [{'text': '👑 Manage Admin Times', 'callback_data': 'admins_menu'}],
-                    [{'text': '🔙 Main Menu', 'callback_data': 'main_menu'}]
-                ]
-            }
+            keyboard = GLOBAL_TIME_SET_KEYBOARD
             
             self.edit_message_text(chat_id, message_id, success_text, reply_markup=keyboard)
-            print(f"✅ Set global delete time to {time_key}")
+            logger.info("✅ Set global delete time to %s", time_key)
             
         except Exception as e:
             self.edit_message_text(chat_id, message_id,
                 f"❌ Error updating delete time: {str(e)}",
                 reply_markup=self.get_back_button())
-            print(f"❌ Error setting global delete time: {e}")
+            logger.error("❌ Error setting global delete time: %s", e)
     
     def show_stats(self, chat_id, message_id):
         """Show bot statistics"""
         stats = self.get_system_stats()
         
-        cursor = self.conn.cursor()
-        cursor.execute('SELECT global_delete_seconds FROM global_settings WHERE id = 1')
-        global_time = cursor.fetchone()[0]
-        global_time_text = self.format_seconds(global_time)
+        global_time_text = self.format_seconds(self._global_delete_seconds)
         
+        cursor = self.get_read_conn().cursor()
         cursor.execute('SELECT COUNT(*) FROM bot_owners')
         owner_count = cursor.fetchone()[0]
         
-        stats_text = f"""📊 <b>Bot Statistics</b>
-
-🤖 Bot: @{self.bot_username or 'N/A'}
-👥 Bot Owners: {owner_count}
-👑 Protected Admins: {stats.get('active_admins', 0)}
-🗑️ Total Posts Deleted: {stats.get('total_posts_deleted', 0)}
-💬 Comments Detected: {stats.get('total_comments_detected', 0)}
-⏰ Pending Deletions: {stats.get('pending_deletions', 0)}
-
-⚙️ <b>Settings:</b>
-• Global Delete Time: {global_time_text}
-• Comment Notifications: ✅ Active
-• Auto-Deletion: ✅ Active
-
-🛡️ <b>Protection Status:</b>
-✅ All systems operational"""
+        stats_text = STATS_TEXT.format(
+            bot_username=self.bot_username or 'N/A',
+            owner_count=owner_count,
+            active_admins=stats.get('active_admins', 0),
+            total_posts_deleted=stats.get('total_posts_deleted', 0),
+            total_comments_detected=stats.get('total_comments_detected', 0),
+            pending_deletions=stats.get('pending_deletions', 0),
+            global_time=global_time_text)
         
-        keyboard = {
-            'inline_keyboard': [
-                [{'text': '⏰ Change Global Time', 'callback_data': 'time_menu'}],
-                [{'text': '🔄 Refresh Stats', 'callback_data': 'stats_menu'}],
-                [{'text': '🔙 Back to Main', 'callback_data': 'main_menu'}]
-            ]
-        }
+        keyboard = STATS_KEYBOARD
         
         self.edit_message_text(chat_id, message_id, stats_text, reply_markup=keyboard)
     
@@ -1354,54 +1925,12 @@ Select new global delete time:"""
     
     def show_help(self, chat_id, message_id):
         """Show help information"""
-        help_text = """📚 <b>Channel Protection Bot Help</b>
-
-🤖 <b>About:</b>
-I automatically delete posts from non-admins and notify about comments.
-
-👑 <b>Protected Admins:</b>
-• Admins' posts are NOT deleted (or deleted after custom time)
-• Each admin can have individual delete time
-• Use the Admins menu to manage them
-
-⏰ <b>Delete Times:</b>
-• Global time applies to all non-admins
-• Admin-specific time overrides global for that admin
-• Times range from 30 seconds to 24 hours
-• "Never" means posts are protected
-
-🔔 <b>Notifications:</b>
-• All bot owners get notified about comments
-• Notifications include message links
-• Comment detection is automatic
-
-⚙️ <b>Setup:</b>
-1. Add me as admin to your channel
-2. Grant me delete message permission
-3. Add trusted users as protected admins
-4. Set delete times as needed
-
-❓ <b>How to Get User ID:</b>
-Use @userinfobot or forward a message from the user to @getidsbot
-
-💡 <b>Adding Admins:</b>
-1. Click "Add Admin" in the menu
-2. Click "Enter User ID Manually"
-3. Send the numeric User ID (e.g., 123456789)
-4. The bot will confirm with success message"""
-
-        keyboard = {
-            'inline_keyboard': [
-                [{'text': '👑 Manage Admins', 'callback_data': 'admins_menu'}],
-                [{'text': '⏰ Set Global Time', 'callback_data': 'time_menu'}],
-                [{'text': '🔙 Main Menu', 'callback_data': 'main_menu'}]
-            ]
-        }
+        keyboard = HELP_KEYBOARD
         
         if message_id:
-            self.edit_message_text(chat_id, message_id, help_text, reply_markup=keyboard)
+            self.edit_message_text(chat_id, message_id, HELP_TEXT, reply_markup=keyboard)
         else:
-            self.send_message(chat_id, help_text, reply_markup=keyboard)
+            self.send_message(chat_id, HELP_TEXT, reply_markup=keyboard)
     
     def handle_group_channel_message(self, message):
         """Handle messages in groups/channels"""
@@ -1428,27 +1957,24 @@ Use @userinfobot or forward a message from the user to @getidsbot
                 return
             
             # FIRST: Check if user is a protected admin
-            cursor = self.conn.cursor()
-            cursor.execute('SELECT delete_after_seconds FROM channel_admins WHERE user_id = ? AND is_active = 1', (user_id,))
-            admin_result = cursor.fetchone()
+            delete_seconds = self._admin_cache.get(user_id)
             
-            if admin_result:
+            if delete_seconds is not None:
                 # User is protected admin
-                delete_seconds = admin_result[0]
                 
                 if delete_seconds == 0:
                     # Admin is COMPLETELY PROTECTED - no deletion at all
-                    print(f"✅ Protected admin {user_name} ({user_id}) posted in {chat_id}")
-                    print(f"   ⏰ Admin is COMPLETELY PROTECTED - NO deletion scheduled")
+                    logger.info("✅ Protected admin %s (%s) posted in %s", user_name, user_id, chat_id)
+                    logger.info("   ⏰ Admin is COMPLETELY PROTECTED - NO deletion scheduled")
                     return
                 else:
                     # Admin has specific delete time
-                    print(f"✅ Protected admin {user_name} ({user_id}) posted in {chat_id}")
-                    print(f"   ⏰ Admin has specific delete time: {self.format_seconds(delete_seconds)}")
+                    logger.info("✅ Protected admin %s (%s) posted in %s", user_name, user_id, chat_id)
+                    logger.info("   ⏰ Admin has specific delete time: %s", self.format_seconds(delete_seconds))
                     
                     # Check if bot is admin before scheduling deletion
                     if not self.is_bot_admin_in_channel(chat_id):
-                        print(f"   ⚠️ Bot is not admin in chat {chat_id}, cannot schedule deletion")
+                        logger.warning("   ⚠️ Bot is not admin in chat %s, cannot schedule deletion", chat_id)
                         return
                     
                     # Schedule deletion for admin's specific time
@@ -1459,58 +1985,55 @@ Use @userinfobot or forward a message from the user to @getidsbot
                     return
             
             # User is NOT a protected admin - handle as non-admin
-            print(f"⚠️ Non-admin {user_name} ({user_id}) posted in {chat_id}")
+            logger.warning("⚠️ Non-admin %s (%s) posted in %s", user_name, user_id, chat_id)
             
             # Check if bot is admin before scheduling deletion
             if not self.is_bot_admin_in_channel(chat_id):
-                print(f"   ⚠️ Bot is not admin in chat {chat_id}, cannot schedule deletion")
+                logger.warning("   ⚠️ Bot is not admin in chat %s, cannot schedule deletion", chat_id)
                 return
             
-            # Get global delete time
-            cursor.execute('SELECT global_delete_seconds FROM global_settings WHERE id = 1')
-            global_delete_seconds = cursor.fetchone()[0]
-            
-            # Schedule deletion for non-admin
+            # Schedule deletion for non-admin with the global delete time
             self.schedule_message_deletion(
                 chat_id, message_id, user_id, user_name, 
-                global_delete_seconds, "global"
+                self._global_delete_seconds, "global"
             )
             
         except Exception as e:
-            print(f"❌ Error handling group/channel message: {e}")
+            logger.error("❌ Error handling group/channel message: %s", e)
     
     def schedule_message_deletion(self, chat_id, message_id, user_id, user_name, delete_seconds, delete_type):
         """Schedule a message for deletion"""
+        # If delete_seconds is 0, don't schedule deletion
+        if delete_seconds == 0:
+            logger.info("   ⏰ %s delete time is 0 - NOT scheduling deletion", delete_type)
+            return
+        
         try:
-            cursor = self.conn.cursor()
-            
             # Extract message content
             # Get message from database context - we'll store minimal info
             post_content = f"Message from {user_name}"
             post_type = "unknown"
             
-            # If delete_seconds is 0, don't schedule deletion
-            if delete_seconds == 0:
-                print(f"   ⏰ {delete_type} delete time is 0 - NOT scheduling deletion")
-                return
-            
-            # Schedule deletion
-            scheduled_time = datetime.now() + timedelta(seconds=delete_seconds)
+            # Schedule deletion (stored as integer Unix seconds, the heap gets a float timestamp)
+            due_timestamp = time.time() + delete_seconds
             
-            cursor.execute('''
+            # The write is queued, so pin the stored time to the heap entry rather than
+            # to whenever the flusher runs
+            self.enqueue_write('''
                 INSERT OR IGNORE INTO non_admin_posts 
                 (channel_id, message_id, user_id, user_name, delete_after_seconds, 
                  scheduled_delete_time, post_content, post_type)
                 VALUES (?, ?, ?, ?, ?, ?, ?, ?)
             ''', (chat_id, message_id, user_id, user_name, delete_seconds, 
-                  scheduled_time, post_content, post_type))
+                  int(due_timestamp), post_content, post_type))
             
-            self.conn.commit()
+            # A duplicate (ignored) insert only costs the monitor one extra wake-up
+            self.push_deletion_time(due_timestamp)
             
-            print(f"   ✅ Scheduled deletion in {self.format_seconds(delete_seconds)} ({delete_type})")
+            logger.info("   ✅ Scheduled deletion in %s (%s)", self.format_seconds(delete_seconds), delete_type)
             
         except Exception as e:
-            print(f"❌ Error scheduling message deletion: {e}")
+            logger.error("❌ Error scheduling message deletion: %s", e)
     
     def handle_channel_post(self, post):
         """Handle posts in channels"""
@@ -1541,13 +2064,12 @@ Use @userinfobot or forward a message from the user to @getidsbot
             comment_text = self.extract_message_content(message)
             
             # Get channel info
-            chat_info = self.get_chat(chat_id)
+            chat_info = self.get_chat_cached(chat_id)
             channel_name = chat_info.get('title', f"Chat {chat_id}") if chat_info else f"Chat {chat_id}"
             channel_username = chat_info.get('username', '')
             
             # Store comment notification
-            cursor = self.conn.cursor()
-            cursor.execute('''
+            self.enqueue_write('''
                 INSERT INTO comment_notifications 
                 (channel_id, original_message_id, comment_message_id, 
                  commenter_id, commenter_name, comment_text, notified_at)
@@ -1555,89 +2077,47 @@ Use @userinfobot or forward a message from the user to @getidsbot
             ''', (chat_id, original_message_id, message['message_id'], 
                   commenter_id, commenter_name, comment_text))
             
-            cursor.execute('UPDATE bot_stats SET total_comments_detected = total_comments_detected + 1 WHERE id = 1')
-            self.conn.commit()
+            # Added to bot_stats as one UPDATE per write flush
+            with self._write_cond:
+                self._stats.comments_detected += 1
             
-            print(f"💬 Comment detected from {commenter_name} in {channel_name}")
+            logger.info("💬 Comment detected from %s in %s", commenter_name, channel_name)
             
             # Generate message link
-            message_link = self.generate_message_link(chat_id, original_message_id)
+            message_link = self.generate_message_link(chat_id, original_message_id, chat_info)
             
-            # Notify ALL bot owners
-            notification_sent = False
-            for owner_id in self.owner_ids:
-                try:
-                    notification_text = f"""💬 <b>New Comment Detected!</b>
-
-📢 Channel: {channel_name}
-{'👤 Username: @' + channel_username if channel_username else '🆔 ID: ' + str(chat_id)}
-
-👤 Commenter: {commenter_name}
-{'📛 Username: @' + username if username else '🆔 ID: ' + str(commenter_id)}
-
-💭 Comment: {comment_text[:200] + '...' if len(comment_text) > 200 else comment_text}
-
-🔗 Message Link: {message_link}
-
-⏰ Time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"""
-                    
-                    result = self.send_message(owner_id, notification_text)
-                    if result and result.get('ok'):
-                        notification_sent = True
-                        print(f"✅ Comment notification sent to owner {owner_id}")
-                except Exception as e:
-                    print(f"❌ Error sending notification to owner {owner_id}: {e}")
+            # Notify ALL bot owners (same text for everyone, sent by the notifier)
+            notification_text = COMMENT_NOTIFICATION_TEXT.format(
+                channel_name=channel_name,
+                channel_line=f"👤 Username: @{channel_username}" if channel_username else f"🆔 ID: {chat_id}",
+                commenter_name=commenter_name,
+                commenter_line=f"📛 Username: @{username}" if username else f"🆔 ID: {commenter_id}",
+                comment=comment_text[:200] + '...' if len(comment_text) > 200 else comment_text,
+                message_link=message_link,
+                time=format_now())
             
-            if notification_sent:
-                print(f"✅ Comment notifications sent to {len(self.owner_ids)} owners")
+            self.notify_owners(notification_text)
+            logger.info("📨 Comment notification queued for %s owners", len(self.owner_ids))
             
         except Exception as e:
-            print(f"❌ Error handling comment: {e}")
+            logger.error("❌ Error handling comment: %s", e)
     
     def extract_message_content(self, message):
         """Extract text content from message"""
-        if 'text' in message:
-            return message['text']
-        elif 'caption' in message:
-            return message['caption']
-        elif 'sticker' in message:
-            return f"Sticker: {message['sticker'].get('emoji', '')}"
-        elif 'photo' in message:
-            return "[Photo]"
-        elif 'video' in message:
-            return "[Video]"
-        elif 'document' in message:
-            return f"Document: {message['document'].get('file_name', '')}"
-        elif 'audio' in message:
-            return "[Audio]"
-        elif 'voice' in message:
-            return "[Voice Message]"
-        else:
-            return "[Media Content]"
+        for key, extract in MESSAGE_CONTENT_EXTRACTORS:
+            if key in message:
+                return extract(message)
+        return "[Media Content]"
     
     def get_message_type(self, message):
         """Get message type"""
-        if 'text' in message:
-            return 'text'
-        elif 'photo' in message:
-            return 'photo'
-        elif 'video' in message:
-            return 'video'
-        elif 'document' in message:
-            return 'document'
-        elif 'sticker' in message:
-            return 'sticker'
-        elif 'audio' in message:
-            return 'audio'
-        elif 'voice' in message:
-            return 'voice'
-        else:
-            return 'unknown'
+        return next((key for key in MESSAGE_TYPES if key in message), 'unknown')
     
-    def generate_message_link(self, chat_id, message_id):
-        """Generate a link to a message"""
+    def generate_message_link(self, chat_id, message_id, chat_info=None):
+        """Generate a link to a message (pass chat_info if the caller already has it)"""
         try:
-            chat_info = self.get_chat(chat_id)
+            if chat_info is None:
+                chat_info = self.get_chat_cached(chat_id)
             if chat_info and 'username' in chat_info:
                 username = chat_info['username']
                 return f"https://t.me/{username}/{message_id}"
@@ -1646,126 +2126,315 @@ Use @userinfobot or forward a message from the user to @getidsbot
         except:
             return f"Message ID: {message_id}"
     
-    def format_seconds(self, seconds):
-        """Format seconds to human readable time"""
-        if seconds < 60:
-            return f"{seconds} seconds"
-        elif seconds < 3600:
-            minutes = seconds // 60
-            return f"{minutes} minute{'s' if minutes > 1 else ''}"
-        elif seconds < 86400:
-            hours = seconds // 3600
-            return f"{hours} hour{'s' if hours > 1 else ''}"
-        else:
-            days = seconds // 86400
-            return f"{days} day{'s' if days > 1 else ''}"
+    @staticmethod
+    @lru_cache(maxsize=64)
+    def format_seconds(seconds):
+        """Format seconds to human readable time (only a handful of distinct values, so cached)"""
+        for unit_seconds, unit_name in TIME_UNITS:
+            if seconds >= unit_seconds:
+                value = seconds // unit_seconds
+                return f"{value} {unit_name}{'s' if value != 1 else ''}"
+        return "0 seconds"
     
     def get_main_menu_keyboard(self):
         """Get main menu keyboard"""
-        return {
-            'inline_keyboard': [
-                [{'text': '👑 Manage Admins', 'callback_data': 'admins_menu'}],
-                [{'text': '⏰ Set Delete Time', 'callback_data': 'time_menu'}],
-                [{'text': '📊 View Stats', 'callback_data': 'stats_menu'}],
-                [{'text': '❓ Help', 'callback_data': 'help_menu'}]
-            ]
-        }
+        return MAIN_MENU_KEYBOARD
     
     def get_back_button(self):
         """Get back button keyboard"""
-        return {
-            'inline_keyboard': [
-                [{'text': '🔙 Back to Main', 'callback_data': 'main_menu'}]
-            ]
-        }
+        return BACK_KEYBOARD
     
     def is_authorized_user(self, user_id):
         """Check if user is authorized to use admin commands"""
-        return user_id in self.owner_ids
+        return user_id in self.owner_id_set
+    
+    def enqueue_write(self, sql, params=()):
+        """Queue a write statement to be committed by the write flusher"""
+        with self._write_cond:
+            self._pending_writes.append((sql, params))
+            if len(self._pending_writes) >= WRITE_FLUSH_SIZE:
+                self._write_cond.notify()
+    
+    def flush_writes(self):
+        """Execute all queued writes and commit them as one transaction"""
+        with self._write_cond:
+            batch = list(self._pending_writes)
+            self._pending_writes.clear()
+            comments_detected = self._stats.comments_detected
+            self._stats.comments_detected = 0
+        
+        if not batch and not comments_detected:
+            return
+        
+        # Runs of the same statement go through a single executemany
+        groups = []
+        for sql, params in batch:
+            if groups and groups[-1][0] == sql:
+                groups[-1][1].append(params)
+            else:
+                groups.append((sql, [params]))
+        
+        with self.write_lock:
+            cursor = self.conn.cursor()
+            for sql, rows in groups:
+                try:
+                    cursor.executemany(sql, rows)
+                except Exception as e:
+                    logger.error("❌ Error executing queued write: %s", e)
+            
+            if comments_detected:
+                cursor.execute('UPDATE bot_stats SET total_comments_detected = total_comments_detected + ? WHERE id = 1',
+                             (comments_detected,))
+            self.conn.commit()
+    
+    def notify_owners(self, text, exclude=None):
+        """Queue a notification for every bot owner except exclude"""
+        for owner_id in self.owner_ids:
+            if owner_id != exclude:
+                self._notify_queue.put((owner_id, text))
+    
+    def send_notification(self, owner_id, text):
+        """Send one owner notification, waiting out a flood limit once"""
+        result = self.send_message(owner_id, text)
+        retry_after = (result or {}).get('parameters', {}).get('retry_after')
+        if retry_after:
+            logger.warning("⏳ Rate limited notifying owner %s, retrying in %ss", owner_id, retry_after)
+            time.sleep(retry_after)
+            result = self.send_message(owner_id, text)
+        
+        if result and result.get('ok'):
+            logger.info("✅ Notification sent to owner %s", owner_id)
+        else:
+            logger.error("❌ Failed to notify owner %s: %s", owner_id, (result or {}).get('description'))
+    
+    def start_notifier(self):
+        """Start the thread that sends queued owner notifications within the api_rate budget"""
+        def notify_loop():
+            while True:
+                owner_id, text = self._notify_queue.get()
+                self.api_rate.acquire()
+                
+                try:
+                    self.api_pool.submit(self.send_notification, owner_id, text)
+                except Exception as e:
+                    logger.error("❌ Notifier error: %s", e)
+        
+        notifier_thread = threading.Thread(target=notify_loop, daemon=True)
+        notifier_thread.start()
+    
+    def start_write_flusher(self):
+        """Start the background thread that commits queued writes"""
+        def flush_loop():
+            while True:
+                with self._write_cond:
+                    if len(self._pending_writes) < WRITE_FLUSH_SIZE:
+                        self._write_cond.wait(WRITE_FLUSH_INTERVAL)
+                try:
+                    self.flush_writes()
+                except Exception as e:
+                    logger.error("❌ Write flusher error: %s", e)
+        
+        flusher_thread = threading.Thread(target=flush_loop, daemon=True)
+        flusher_thread.start()
+    
+    def push_deletion_time(self, due_timestamp):
+        """Add a deletion time to the heap and wake the monitor"""
+        with self._delete_cond:
+            heapq.heappush(self._delete_heap, due_timestamp)
+            self._delete_cond.notify()
+    
+    def load_pending_deletions(self):
+        """Load pending deletion times from database into the heap"""
+        try:
+            cursor = self.get_read_conn().cursor()
+            cursor.execute('''
+                SELECT scheduled_delete_time FROM non_admin_posts 
+                WHERE is_active = 1 AND scheduled_delete_time IS NOT NULL
+            ''')
+            due_times = [row[0] for row in cursor.fetchall()]
+            
+            with self._delete_cond:
+                self._delete_heap.extend(due_times)
+                heapq.heapify(self._delete_heap)
+                self._delete_cond.notify()
+            
+            logger.info("✅ Loaded %s pending deletions", len(due_times))
+        except Exception as e:
+            logger.error("❌ Error loading pending deletions: %s", e)
+    
+    def wait_for_due_posts(self, max_wait=MONITOR_MAX_WAIT):
+        """Sleep until the earliest scheduled deletion is due, return False if max_wait passed first"""
+        with self._delete_cond:
+            deadline = time.time() + max_wait
+            while True:
+                now = time.time()
+                next_due = self._delete_heap[0] if self._delete_heap else deadline
+                if next_due <= now:
+                    break
+                if now >= deadline:
+                    return False
+                self._delete_cond.wait(min(next_due, deadline) - now)
+        
+        # Let deletions due in the next moment join the same batch
+        time.sleep(DELETE_BATCH_WINDOW)
+        
+        with self._delete_cond:
+            now = time.time()
+            while self._delete_heap and self._delete_heap[0] <= now:
+                heapq.heappop(self._delete_heap)
+        return True
     
     def start_auto_delete_monitor(self):
         """Start monitoring for auto-delete posts"""
         def monitor_posts():
+            self.load_pending_deletions()
+            self.check_and_delete_posts()
             while True:
                 try:
+                    # Sweep when the heap says something is due, and also every MONITOR_MAX_WAIT
+                    # so active rows that lost their heap entry (e.g. a failed sweep) still get deleted
+                    self.wait_for_due_posts()
                     self.check_and_delete_posts()
-                    time.sleep(30)  # Check every 30 seconds
                 except Exception as e:
-                    print(f"❌ Auto-delete monitor error: {e}")
+                    logger.error("❌ Auto-delete monitor error: %s", e)
                     time.sleep(60)
         
         monitor_thread = threading.Thread(target=monitor_posts, daemon=True)
         monitor_thread.start()
-        print("✅ Auto-delete monitoring started!")
+        logger.info("✅ Auto-delete monitoring started!")
     
     def check_and_delete_posts(self):
         """Check for posts that need to be deleted"""
         try:
-            cursor = self.conn.cursor()
-            cursor.execute('''
-                SELECT id, channel_id, message_id, user_id, user_name 
-                FROM non_admin_posts 
-                WHERE is_active = 1 
-                AND scheduled_delete_time <= datetime('now')
-            ''')
-            
-            posts_to_delete = cursor.fetchall()
+            # Make sure recently scheduled posts are in the table before scanning it
+            self.flush_writes()
+            
+            # Claim the due posts with a lease: they stay active but are not due again for
+            # MONITOR_MAX_WAIT, so a crash mid-sweep leaves them to be retried, not lost
+            with self.write_lock:
+                posts_to_delete = self.conn.execute('''
+                    UPDATE non_admin_posts 
+                    SET scheduled_delete_time = CAST(strftime('%s', 'now') AS INTEGER) + ? 
+                    WHERE is_active = 1 
+                    AND scheduled_delete_time <= CAST(strftime('%s', 'now') AS INTEGER)
+                    RETURNING id, channel_id, message_id, user_id, user_name
+                ''', (MONITOR_MAX_WAIT,)).fetchall()
+                self.conn.commit()
             
+            # Group by channel so each channel's posts go out in deleteMessages batches
+            # (channel_id is stored as TEXT, use int keys like the update handlers)
+            posts_by_channel = defaultdict(list)
             for post in posts_to_delete:
-                post_id, channel_id, message_id, user_id, user_name = post
-                
+                posts_by_channel[int(post[1])].append(post)
+            
+            # Posts that are finished with (deleted, or dropped because the bot lost admin),
+            # marked inactive in one UPDATE at the end of the sweep; failed posts keep their lease
+            done_ids = []
+            failed_ids = []
+            
+            for channel_id, posts in posts_by_channel.items():
                 # Check if bot is still admin before trying to delete
                 if not self.is_bot_admin_in_channel(channel_id):
-                    print(f"⚠️ Bot is no longer admin in {channel_id}, skipping deletion")
-                    cursor.execute('''
-                        UPDATE non_admin_posts 
-                        SET is_active = 0, deleted_at = datetime('now') 
-                        WHERE id = ?
-                    ''', (post_id,))
-                    self.conn.commit()
+                    logger.warning("⚠️ Bot is no longer admin in %s, skipping deletion", channel_id)
+                    done_ids.extend(post[0] for post in posts)
                     continue
                 
-                # Try to delete the message
-                success = self.delete_message(channel_id, message_id)
-                
-                if success:
-                    cursor.execute('''
-                        UPDATE non_admin_posts 
-                        SET is_active = 0, deleted_at = datetime('now') 
-                        WHERE id = ?
-                    ''', (post_id,))
-                    self.conn.commit()
+                for start in range(0, len(posts), DELETE_BATCH_SIZE):
+                    batch = posts[start:start + DELETE_BATCH_SIZE]
                     
-                    print(f"✅ Successfully deleted non-admin post from {user_name} ({user_id})")
+                    # Try to delete the whole batch, fall back to one by one (concurrently) on failure;
+                    # each fallback call takes an api_rate token so the burst stays under Telegram's limit
+                    if self.delete_messages(channel_id, [post[2] for post in batch]):
+                        deleted = batch
+                    else:
+                        futures = []
+                        for post in batch:
+                            self.api_rate.acquire()
+                            futures.append(self.api_pool.submit(self.delete_message, channel_id, post[2]))
+                        deleted = []
+                        for post, future in zip(batch, futures):
+                            if future.result():
+                                deleted.append(post)
+                            else:
+                                failed_ids.append(post[0])
                     
-        except Exception as e:
-            print(f"❌ Error checking auto-delete posts: {e}")
-    
-    def get_system_stats(self):
-        """Get system statistics"""
-        try:
-            cursor = self.conn.cursor()
+                    for post_id, _, _, user_id, user_name in deleted:
+                        done_ids.append(post_id)
+                        logger.info("✅ Successfully deleted non-admin post from %s (%s)", user_name, user_id)
+            
+            with self.write_lock:
+                # Chunked to stay under SQLite's bound-parameter limit on large sweeps
+                for start in range(0, len(done_ids), DELETE_BATCH_SIZE):
+                    chunk = done_ids[start:start + DELETE_BATCH_SIZE]
+                    self.conn.execute(f'''
+                        UPDATE non_admin_posts 
+                        SET is_active = 0, deleted_at = datetime('now') 
+                        WHERE id IN ({','.join('?' * len(chunk))})
+                    ''', chunk)
+                
+                # Commits the UPDATE above together with the counters
+                self.flush_stats()
             
-            cursor.execute('SELECT COUNT(*) FROM channel_admins WHERE is_active = 1')
-            active_admins = cursor.fetchone()[0]
+            # Posts that failed to delete become due again when their lease runs out
+            if failed_ids:
+                self.push_deletion_time(time.time() + MONITOR_MAX_WAIT)
             
-            cursor.execute('SELECT total_admins_added, total_posts_deleted, total_comments_detected FROM bot_stats WHERE id = 1')
-            stats = cursor.fetchone()
+        except Exception as e:
+            logger.error("❌ Error checking auto-delete posts: %s", e)
+    
+    def flush_stats(self):
+        """Write pending in-memory counters to the bot_stats table and commit"""
+        with self._write_cond:
+            posts_deleted = self._stats.posts_deleted
+            self._stats.posts_deleted = 0
+        
+        with self.write_lock:
+            if posts_deleted:
+                self.conn.execute('UPDATE bot_stats SET total_posts_deleted = total_posts_deleted + ? WHERE id = 1',
+                                  (posts_deleted,))
             
-            cursor.execute('SELECT COUNT(*) FROM non_admin_posts WHERE is_active = 1')
-            pending_deletions = cursor.fetchone()[0]
+            self.conn.commit()
+    
+    def get_system_stats(self):
+        """Get system statistics (cached for STATS_CACHE_TTL seconds)"""
+        with self._stats_cache_lock:
+            if self._stats_cache and time.monotonic() - self._stats_cache_time < STATS_CACHE_TTL:
+                return self._stats_cache
             
-            return {
-                'active_admins': active_admins,
-                'total_admins_added': stats[0] if stats else 0,
-                'total_posts_deleted': stats[1] if stats else 0,
-                'total_comments_detected': stats[2] if stats else 0,
-                'pending_deletions': pending_deletions,
-                'bot_username': self.bot_username or 'N/A'
-            }
-        except Exception as e:
-            print(f"❌ Error getting stats: {e}")
-            return {'error': str(e)}
+            try:
+                cursor = self.get_read_conn().cursor()
+                # The pending count is answered from the partial index idx_non_admin_posts_due
+                cursor.execute('''
+                    SELECT 
+                        (SELECT COUNT(*) FROM non_admin_posts WHERE is_active = 1),
+                        total_admins_added, total_posts_deleted, total_comments_detected
+                    FROM bot_stats WHERE id = 1
+                ''')
+                stats = cursor.fetchone() or (0, 0, 0, 0)
+                
+                # Include counts still held in memory (_admin_cache holds exactly the active admins)
+                self._stats_cache = {
+                    'active_admins': len(self._admin_cache),
+                    'total_admins_added': stats[1],
+                    'total_posts_deleted': stats[2] + self._stats.posts_deleted,
+                    'total_comments_detected': stats[3] + self._stats.comments_detected,
+                    'pending_deletions': stats[0],
+                    'bot_username': self.bot_username or 'N/A'
+                }
+                self._stats_cache_json = (orjson.dumps(self._stats_cache) if orjson is not None else
+                                          json.dumps(self._stats_cache, separators=(',', ':')).encode())
+                self._stats_cache_time = time.monotonic()
+                return self._stats_cache
+            except Exception as e:
+                logger.error("❌ Error getting stats: %s", e)
+                return {'error': str(e)}
+    
+    def get_system_stats_json(self):
+        """Get system statistics as pre-encoded JSON bytes, or None on error"""
+        stats = self.get_system_stats()
+        if 'error' in stats:
+            return None
+        return self._stats_cache_json
     
     def run(self):
         """Initialize and run bot services"""
@@ -1774,8 +2443,9 @@ Use @userinfobot or forward a message from the user to @getidsbot
             print("❌ Bot cannot start. Connection test failed.")
             return False
         
-        # Try to setup webhook (for Render)
-        self.setup_webhook()
+        # Try to setup webhook (for Render), otherwise poll getUpdates
+        if not self.setup_webhook():
+            self.start_long_polling()
         
         # Start auto-delete monitoring
         self.start_auto_delete_monitor()
@@ -1818,9 +2488,15 @@ if __name__ == "__main__":
             if bot.run():
                 print("✅ Bot services running successfully!")
                 
-                # Keep the main thread alive
-                while True:
-                    time.sleep(3600)  # Sleep for 1 hour
+                # Keep the main thread alive until SIGTERM (Render stops services with it)
+                shutdown = threading.Event()
+                signal.signal(signal.SIGTERM, lambda signum, frame: shutdown.set())
+                shutdown.wait()
+                
+                print("\n🛑 Bot stopped by SIGTERM")
+                bot.flush_writes()
+                bot.flush_stats()
+                break
                     
             else:
                 print("❌ Bot initialization failed")
@@ -1831,6 +2507,7 @@ if __name__ == "__main__":
             break
         except Exception as e:
             print(f"💥 Bot crash (#{restart_count}): {e}")
+            import traceback
             traceback.print_exc()
             
             if restart_count < max_restarts: